@@ -0,0 +1,112 @@
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IN_FLIGHT = "in-flight"
+DONE = "done"
+
+# response headers replayed along with the stored response
+_REPLAYED_HEADERS = ("Location", "Preference-Applied")
+
+
+def get_idempotency_cache_key(user_id: int, method: str, path: str, key: str) -> str:
+    digest = hashlib.sha256(f"{method}:{path}:{key}".encode()).hexdigest()
+    return f"idempotency:{user_id}:{digest}"
+
+
+def _fingerprint(request) -> str:
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _replay(record: dict) -> Response:
+    headers = {**record["headers"], "Idempotent-Replayed": "true"}
+    return Response(record["data"], status=record["status"], headers=headers)
+
+
+def idempotent(handler):
+    """
+    Makes an APIView handler idempotent for requests with "Idempotency-Key" header.
+
+    The first response per user, endpoint and key is stored for
+    IDEMPOTENCY_KEY_TIMEOUT seconds and replayed to the following requests
+    without calling the handler. Duplicates arriving while the first request
+    is still in progress wait for its response, up to IDEMPOTENCY_LOCK_TIMEOUT
+    seconds, then get 409. Reusing a key with another body gives 422.
+    Server errors and raised exceptions aren't stored, so the request can be retried.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+        if not key:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {"detail": f"{IDEMPOTENCY_KEY_HEADER} is too long."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_key = get_idempotency_cache_key(
+            request.user.pk, request.method, request.path, key
+        )
+        fingerprint = _fingerprint(request)
+        lock_timeout = settings.IDEMPOTENCY_LOCK_TIMEOUT
+        deadline = time.monotonic() + lock_timeout
+
+        while not cache.add(
+            cache_key, {"state": IN_FLIGHT, "fingerprint": fingerprint}, lock_timeout
+        ):
+            record = cache.get(cache_key)
+            if record is None:
+                # in-flight request failed or expired, try to take over
+                continue
+            if record["fingerprint"] != fingerprint:
+                return Response(
+                    {"detail": "Idempotency key was used for another request."},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            if record["state"] == DONE:
+                return _replay(record)
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"detail": "A request with this key is still in progress."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            time.sleep(0.05)
+
+        try:
+            response = handler(self, request, *args, **kwargs)
+        except BaseException:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+            return response
+
+        record = {
+            "state": DONE,
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "data": response.data,
+            "headers": {
+                header: response[header]
+                for header in _REPLAYED_HEADERS
+                if response.has_header(header)
+            },
+        }
+        cache.set(cache_key, record, settings.IDEMPOTENCY_KEY_TIMEOUT)
+        return response
+
+    return wrapper
@@ -0,0 +1,32 @@
+import time
+import uuid
+
+from django.core.cache import cache
+
+
+def acquire_lock(key: str, timeout: float) -> str | None:
+    """Takes a cache lock. Returns a token to release it with, None if it's held."""
+    token = uuid.uuid4().hex
+    return token if cache.add(key, token, timeout) else None
+
+
+def release_lock(key: str, token: str) -> None:
+    """Releases a lock, unless it has expired and was taken by someone else."""
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def backoff(timeout: float, initial: float = 0.05, maximum: float = 1.0):
+    """
+    Yields until timeout seconds pass,
+    sleeping with exponentially growing delays between iterations.
+    """
+    deadline = time.monotonic() + timeout
+    delay = initial
+    while True:
+        yield
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, maximum)
@@ -0,0 +1,15 @@
+from typing import override
+
+
+class MemoizedObjectMixin:
+    """
+    Memoizes get_object() for the rest of the request.
+    The object is loaded and its permissions are checked only once,
+    no matter how many times the view asks for it.
+    """
+
+    @override
+    def get_object(self):
+        if not hasattr(self, "_object"):
+            self._object = super().get_object()
+        return self._object
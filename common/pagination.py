@@ -0,0 +1,25 @@
+class CursorPaginationMixin:
+    """
+    Switches view to `cursor_pagination_class` if client asks for it
+    with "?pagination=cursor" (or passes a cursor).
+    Otherwise view keeps its regular `pagination_class`.
+    """
+
+    cursor_pagination_class = None
+
+    def is_cursor_pagination_requested(self) -> bool:
+        request = getattr(self, "request", None)
+        if self.cursor_pagination_class is None or request is None:
+            return False
+
+        params = request.query_params
+        return (
+            params.get("pagination") == "cursor"
+            or self.cursor_pagination_class.cursor_query_param in params
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.is_cursor_pagination_requested():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -76,6 +76,22 @@ DATABASES = {
 }
 
 
+CACHE_URL = os.getenv("CACHE_URL")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -108,6 +124,15 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
 
+USER_ROLES_CACHE_TIMEOUT = 60 * 60
+USER_RECENT_PAYMENTS_COUNT = 5
+IDEMPOTENCY_KEY_TIMEOUT = 60 * 60 * 24
+
+# redis buffering user activity, the cache one is used if not set
+USER_ACTIVITY_BUFFER_URL = os.getenv("USER_ACTIVITY_BUFFER_URL") or CACHE_URL
+USER_ACTIVITY_RECORD_INTERVAL = 60
+USER_ACTIVITY_FLUSH_LOCK_TIMEOUT = 60 * 5
+
 
 if DEBUG:
     EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
@@ -131,12 +156,20 @@ CORS_ALLOW_ALL_ORIGINS = False
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication"
+        "users.authentication.StatelessJWTAuthentication"
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": "30/min",
+        "login_email": "5/min",
+        "register_ip": "10/hour",
+        "register_email": "3/hour",
+    },
+    # client IP is taken from X-Forwarded-For behind that many proxies
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES") or 0),
 }
 
 SPECTACULAR_SETTINGS = {
@@ -148,10 +181,53 @@ SPECTACULAR_SETTINGS = {
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.TokenRefreshSerializer",
 }
 
 
+LESSONS_BULK_CREATE_MAX_SIZE = 500
+COURSE_DETAIL_CACHE_TIMEOUT = 60 * 60
+COURSE_UPDATE_NOTIFICATION_QUIET_PERIOD = timedelta(minutes=15)
+COURSE_UPDATE_NOTIFICATION_INTERVAL = timedelta(hours=4)
+COURSE_UPDATE_EMAILS_CHUNK_SIZE = 500
+COURSE_UPDATE_EMAILS_MAX_RETRIES = 3
+COURSE_UPDATE_EMAILS_RETRY_DELAY = 60
+
+INACTIVE_USERS_PERIOD = timedelta(days=30)
+INACTIVE_USERS_BATCH_SIZE = 1000
+INACTIVE_USERS_LOCK_TIMEOUT = 60 * 10
+
+# retry delay is doubled on every attempt
+PAYMENT_CHECKOUT_MAX_RETRIES = 5
+PAYMENT_CHECKOUT_RETRY_DELAY = 5
+
+STRIPE_SESSION_STATUS_CACHE_TIMEOUT = 5
+STRIPE_SESSION_STATUS_LOCK_TIMEOUT = 10
+
+# stripe checkout sessions expire after 24 hours
+PAYMENTS_RECONCILIATION_WINDOW = timedelta(days=2)
+PAYMENTS_RECONCILIATION_BATCH_SIZE = 100
+PAYMENTS_RECONCILIATION_CONCURRENCY = 8
+
+
 STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+STRIPE_TIMEOUT = 10
+STRIPE_MAX_NETWORK_RETRIES = 2
+STRIPE_POOL_SIZE = 10
+STRIPE_CIRCUIT_FAILURE_THRESHOLD = 5
+STRIPE_CIRCUIT_WINDOW = 60
+STRIPE_CIRCUIT_RESET_TIMEOUT = 30
+
+# longest stripe call, network retries are backed off by stripe up to 5 seconds
+STRIPE_CALL_MAX_DURATION = STRIPE_TIMEOUT + STRIPE_MAX_NETWORK_RETRIES * (
+    STRIPE_TIMEOUT + 5
+)
+# creating a course price calls stripe for product and price
+STRIPE_PRICE_LOCK_TIMEOUT = 2 * STRIPE_CALL_MAX_DURATION
+# longest idempotent request creates stripe product, price and checkout session
+IDEMPOTENCY_LOCK_TIMEOUT = 3 * STRIPE_CALL_MAX_DURATION
 
 
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
@@ -166,4 +242,12 @@ CELERY_BEAT_SCHEDULE = {
         "task": "materials.tasks.block_inactive_users",
         "schedule": timedelta(days=1),
     },
+    "flush_user_activity": {
+        "task": "users.tasks.flush_user_activity",
+        "schedule": timedelta(minutes=1),
+    },
+    "reconcile_unpaid_payments": {
+        "task": "payments.tasks.reconcile_unpaid_payments",
+        "schedule": timedelta(minutes=30),
+    },
 }
@@ -0,0 +1,51 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _lessons_version_key(course_id: int) -> str:
+    return f"materials:course:{course_id}:lessons-version"
+
+
+def get_lessons_version(course_id: int) -> int:
+    """
+    Returns current version of lessons of a given course.
+
+    Missing version is initialized with current time, so a version evicted
+    from the cache never points back to an outdated entry.
+    """
+    key = _lessons_version_key(course_id)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_lessons_version(course_ids) -> None:
+    """Changes lessons version of given courses, again once the transaction commits."""
+    keys = [_lessons_version_key(course_id) for course_id in set(course_ids)]
+    if not keys:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({key: version for key in keys}, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_course_detail_cache_key(course, request) -> str:
+    """Builds a key, that changes whenever course or any of its lessons changes."""
+    return ":".join(
+        [
+            "materials:course-detail",
+            str(course.pk),
+            str(course.updated_at.timestamp()),
+            str(get_lessons_version(course.pk)),
+            request.get_host(),
+        ]
+    )
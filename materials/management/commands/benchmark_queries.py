@@ -0,0 +1,213 @@
+import random
+import re
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from materials.models import Course, Lesson, Subscription
+from payments.models import Payment
+
+User = get_user_model()
+
+_EXECUTION_TIME_RE = re.compile(r"Execution Time: ([\d.]+) ms")
+_SCAN_RE = re.compile(r"(?:\w+ )*Scan(?: using \w+)? on \w+")
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a large dataset and prints EXPLAIN ANALYZE timings "
+        "of the queries behind the API endpoints. "
+        "Seeded data is rolled back unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5_000)
+        parser.add_argument("--courses", type=int, default=2_000)
+        parser.add_argument("--lessons-per-course", type=int, default=10)
+        parser.add_argument("--payments", type=int, default=100_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep seeded data in the database."
+        )
+        parser.add_argument(
+            "--plans", action="store_true", help="Print full query plans."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Benchmark requires PostgreSQL.")
+
+        rnd = random.Random(options["seed"])
+
+        with transaction.atomic():
+            self.stdout.write("Seeding data...")
+            self.seed(rnd, options)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "ANALYZE users_user, materials_course, materials_lesson, "
+                    "materials_subscription, payments_payment"
+                )
+
+            for name, queryset in self.get_queries():
+                self.explain(name, queryset, options["plans"])
+
+            if not options["keep"]:
+                transaction.set_rollback(True)
+
+    def seed(self, rnd: random.Random, options) -> None:
+        now = timezone.now()
+        password = make_password(None)
+        prefix = uuid.uuid4().hex[:8]
+
+        users = User.objects.bulk_create(
+            User(
+                email=f"bench-{prefix}-{i}@example.com",
+                password=password,
+                last_login=now - timedelta(days=rnd.randint(0, 90)),
+            )
+            for i in range(options["users"])
+        )
+
+        courses = Course.objects.bulk_create(
+            (
+                Course(title=f"Course {i}", owner=rnd.choice(users), price=100)
+                for i in range(options["courses"])
+            ),
+            batch_size=1_000,
+        )
+
+        Lesson.objects.bulk_create(
+            (
+                Lesson(
+                    title=f"Lesson {i}",
+                    video_url="https://youtube.com",
+                    course=course,
+                    owner_id=course.owner_id,
+                )
+                for course in courses
+                for i in range(options["lessons_per_course"])
+            ),
+            batch_size=5_000,
+        )
+
+        Subscription.objects.bulk_create(
+            (
+                Subscription(user=user, course=course)
+                for user in users[:100]
+                for course in rnd.sample(courses, min(len(courses), 20))
+            ),
+            batch_size=5_000,
+            ignore_conflicts=True,
+        )
+
+        methods = Payment.PaymentMethod.values
+        payments = Payment.objects.bulk_create(
+            (
+                Payment(
+                    user=rnd.choice(users),
+                    course=rnd.choice(courses),
+                    amount=100,
+                    method=(method := rnd.choice(methods)),
+                    stripe_session_id=(
+                        f"cs_bench_{prefix}_{i}"
+                        if method == Payment.PaymentMethod.STRIPE
+                        else None
+                    ),
+                    is_paid=rnd.random() < 0.8,
+                )
+                for i in range(options["payments"])
+            ),
+            batch_size=5_000,
+        )
+
+        # auto_now fields got the same value, spread them out
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE materials_course "
+                "SET updated_at = now() - random() * interval '90 days' "
+                "WHERE id >= %s",
+                [courses[0].pk],
+            )
+            cursor.execute(
+                "UPDATE payments_payment "
+                "SET timestamp = now() - random() * interval '365 days' "
+                "WHERE id >= %s",
+                [payments[0].pk],
+            )
+
+    def get_queries(self):
+        """Returns (name, queryset) pairs mirroring queries run by the endpoints."""
+        user = User.objects.filter(courses__isnull=False).first()
+        course = Course.objects.filter(owner=user).first()
+        middle = Course.objects.order_by("id")[Course.objects.count() // 2]
+        payment = Payment.objects.filter(stripe_session_id__isnull=False).last()
+        courses = Course.objects.with_lessons().with_subscription_status(user)
+
+        return [
+            ("course list (moderator)", courses[:5]),
+            ("course list (owner)", courses.filter(owner=user)[:5]),
+            (
+                "course list (cursor, deep page)",
+                courses.filter(pk__gt=middle.pk).order_by("id")[:6],
+            ),
+            ("course detail", courses.filter(pk=course.pk)),
+            (
+                "course lessons prefetch",
+                Lesson.objects.filter(course__in=[course.pk]).order_by("id"),
+            ),
+            (
+                "lesson list (owner)",
+                Lesson.objects.filter(owner=user).order_by("id")[:5],
+            ),
+            ("payment list", Payment.objects.order_by("timestamp", "id")[:20]),
+            (
+                "payment list (by user)",
+                Payment.objects.filter(user=user).order_by("timestamp", "id")[:20],
+            ),
+            (
+                "payment list (by course)",
+                Payment.objects.filter(course=course).order_by("timestamp")[:20],
+            ),
+            (
+                "payment list (by method)",
+                Payment.objects.filter(method=Payment.PaymentMethod.CASH).order_by(
+                    "timestamp"
+                )[:20],
+            ),
+            (
+                "payment status",
+                Payment.objects.filter(stripe_session_id=payment.stripe_session_id),
+            ),
+            (
+                "unpaid stripe payments",
+                Payment.objects.filter(
+                    method=Payment.PaymentMethod.STRIPE,
+                    is_paid=False,
+                    timestamp__gte=timezone.now() - timedelta(days=1),
+                ),
+            ),
+            (
+                "inactive users",
+                User.objects.filter(
+                    last_login__lt=timezone.now() - timedelta(days=30),
+                    is_active=True,
+                    is_staff=False,
+                    is_superuser=False,
+                ),
+            ),
+        ]
+
+    def explain(self, name: str, queryset, print_plan: bool) -> None:
+        plan = queryset.explain(analyze=True, buffers=True)
+        match = _EXECUTION_TIME_RE.search(plan)
+        execution_time = float(match.group(1)) if match else float("nan")
+        scans = ", ".join(_SCAN_RE.findall(plan))
+
+        self.stdout.write(f"{name:<35} {execution_time:>10.3f} ms  {scans}")
+        if print_plan:
+            self.stdout.write(plan + "\n")
@@ -0,0 +1,87 @@
+from django.db import connection, models
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def get_lessons_prefetch() -> Prefetch:
+    """Returns prefetch of course lessons in the order they're displayed."""
+    from .models import Lesson
+
+    return Prefetch("lessons", queryset=Lesson.objects.order_by("id"))
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_lessons(self):
+        """Prefetches course lessons and annotates their count."""
+        from .models import Lesson
+
+        # a correlated subquery instead of JOIN + GROUP BY keeps
+        # ordering/limit of the outer query on its indexes
+        lessons_count = (
+            Lesson.objects.filter(course=OuterRef("pk"))
+            .order_by()
+            .values("course")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return self.annotate(
+            lessons_count=Coalesce(Subquery(lessons_count), Value(0))
+        ).prefetch_related(get_lessons_prefetch())
+
+    def with_subscription_status(self, user):
+        """Annotates whether given user is subscribed to each course."""
+        from .models import Subscription
+
+        return self.annotate(
+            is_subscribed=Exists(
+                Subscription.objects.filter(user=user.pk, course=OuterRef("pk"))
+            )
+        )
+
+
+class SubscriptionManager(models.Manager):
+    def toggle(self, user_id: int, course_id: int) -> tuple[bool, int] | None:
+        """
+        Subscribes user to a course or unsubscribes if already subscribed.
+
+        Runs as a single statement, concurrent toggles of the same pair
+        can't violate the unique constraint.
+        Returns new subscription state and course subscribers count,
+        or None if course doesn't exist.
+        """
+        subscriptions = self.model._meta.db_table
+        courses = self.model._meta.get_field("course").related_model._meta.db_table
+
+        # counts see the snapshot taken before the statement, so changes
+        # made by the statement itself are added on top (a toggle racing
+        # on the same course may still be off by one)
+        sql = f"""
+            WITH course AS (
+                SELECT id FROM {courses} WHERE id = %(course_id)s
+            ),
+            deleted AS (
+                DELETE FROM {subscriptions}
+                WHERE user_id = %(user_id)s AND course_id = %(course_id)s
+                RETURNING id
+            ),
+            inserted AS (
+                INSERT INTO {subscriptions} (user_id, course_id)
+                SELECT %(user_id)s, id FROM course
+                WHERE NOT EXISTS (SELECT 1 FROM deleted)
+                ON CONFLICT (user_id, course_id) DO NOTHING
+                RETURNING id
+            )
+            SELECT
+                EXISTS (SELECT 1 FROM course),
+                NOT EXISTS (SELECT 1 FROM deleted),
+                (SELECT count(*) FROM {subscriptions} WHERE course_id = %(course_id)s)
+                    - (SELECT count(*) FROM deleted)
+                    + (SELECT count(*) FROM inserted)
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, {"user_id": user_id, "course_id": course_id})
+            course_exists, is_subscribed, subscribers_count = cursor.fetchone()
+
+        if not course_exists:
+            return None
+        return is_subscribed, subscribers_count
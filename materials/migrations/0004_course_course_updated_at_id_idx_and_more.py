@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0003_course_updated_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                fields=["updated_at", "id"], name="course_updated_at_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="course",
+            index=models.Index(
+                fields=["owner", "updated_at", "id"], name="course_owner_updated_at_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="lesson",
+            index=models.Index(fields=["owner", "id"], name="lesson_owner_id_idx"),
+        ),
+    ]
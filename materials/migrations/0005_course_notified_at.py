@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0004_course_course_updated_at_id_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="notified_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:43
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0005_course_notified_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="course",
+            name="course_updated_at_id_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="course",
+            name="course_owner_updated_at_idx",
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.db import models
 
+from .managers import CourseQuerySet, SubscriptionManager
+
 
 class Course(models.Model):
     title = models.CharField(max_length=200)
@@ -11,6 +13,9 @@ class Course(models.Model):
     )
     price = models.DecimalField(max_digits=10, decimal_places=2)
     updated_at = models.DateTimeField(auto_now=True)
+    notified_at = models.DateTimeField(blank=True, null=True)
+
+    objects = CourseQuerySet.as_manager()
 
     def __str__(self) -> str:
         return self.title
@@ -22,10 +27,17 @@ class Lesson(models.Model):
     preview = models.ImageField(upload_to="lessons/previews/", blank=True, null=True)
     video_url = models.URLField()
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="lessons")
+    # covered by lesson_owner_id_idx
     owner = models.ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="lessons"
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="lessons",
+        db_index=False,
     )
 
+    class Meta:
+        indexes = [models.Index(fields=["owner", "id"], name="lesson_owner_id_idx")]
+
     def __str__(self) -> str:
         return self.title
 
@@ -38,6 +50,8 @@ class Subscription(models.Model):
         Course, on_delete=models.CASCADE, related_name="subscriptions"
     )
 
+    objects = SubscriptionManager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
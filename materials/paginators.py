@@ -1,7 +1,20 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class MaterialsPaginator(PageNumberPagination):
     page_size = 5
     page_size_query_param = "page_size"
     max_page_size = 10
+
+
+class MaterialsCursorPaginator(CursorPagination):
+    """
+    Cursor pagination without total count.
+    Cursor is positioned on the unique and immutable id, so rows edited
+    while a client pages through aren't skipped or repeated.
+    """
+
+    page_size = 5
+    page_size_query_param = "page_size"
+    max_page_size = 10
+    ordering = ("id",)
@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 
+from .cache import bump_lessons_version
 from .models import Course, Lesson
 from .validators import AllowedDomainValidator
 
@@ -15,21 +17,72 @@ class LessonSerializer(serializers.ModelSerializer):
         """Validates, if current course belongs to user."""
         user = self.context["request"].user
 
-        if course.owner != user:
+        if course.owner_id != user.pk:
             raise serializers.ValidationError("You don't own this course")
 
         return course
 
 
+class LessonBulkListSerializer(serializers.ListSerializer):
+    """Validates a batch of lessons resolving all their courses in one query."""
+
+    def to_internal_value(self, data):
+        course_ids = set()
+        if isinstance(data, list):
+            for item in data:
+                try:
+                    course_ids.add(int(item["course"]))
+                except (TypeError, KeyError, ValueError):
+                    pass
+
+        self.courses = Course.objects.only("id", "owner_id").in_bulk(course_ids)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            lessons = Lesson.objects.bulk_create(
+                [Lesson(**attrs) for attrs in validated_data]
+            )
+        bump_lessons_version(lesson.course_id for lesson in lessons)
+        return lessons
+
+
+class BulkCourseField(serializers.PrimaryKeyRelatedField):
+    """Takes courses preloaded by `LessonBulkListSerializer` instead of querying."""
+
+    def to_internal_value(self, data):
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        course = self.parent.parent.courses.get(pk)
+        if course is None:
+            self.fail("does_not_exist", pk_value=data)
+        return course
+
+
+class LessonBulkSerializer(LessonSerializer):
+    course = BulkCourseField(queryset=Course.objects.all())
+
+    class Meta(LessonSerializer.Meta):
+        list_serializer_class = LessonBulkListSerializer
+
+
 class CourseSerializer(serializers.ModelSerializer):
     lessons = LessonSerializer(many=True, read_only=True)
     lessons_count = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     def get_lessons_count(self, instance):
+        if hasattr(instance, "lessons_count"):
+            return instance.lessons_count
         return instance.lessons.count()
 
     def get_is_subscribed(self, instance):
+        if hasattr(instance, "is_subscribed"):
+            return instance.is_subscribed
+
         user = self.context["request"].user
         if user.is_authenticated:
             return user.subscriptions.filter(course=instance).exists()
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_lessons_version
+from .models import Lesson
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def bump_lessons_version_on_lesson_change(sender, instance, **kwargs):
+    bump_lessons_version([instance.course_id])
@@ -1,40 +1,274 @@
-from datetime import timedelta
+import smtplib
+import time
+from itertools import batched
 
-from celery import shared_task
+from celery import chord, shared_task
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
 from django.utils import timezone
 
+from common.locks import acquire_lock, release_lock
+from users.activity import flush_user_activity, get_activity_buffer
+from users.denylist import deny_user_tokens
+
 from .models import Course
 
 User = get_user_model()
 
 
 @shared_task
-def notify_about_course_update(course_id: int) -> None:
-    """Sends email to all subscribed to given course users."""
+def notify_about_course_update(course_id: int) -> int:
+    """
+    Sends email to all subscribed to given course users.
+
+    Recipients are split into chunks by primary key ranges and every chunk
+    is loaded and sent by its own subtask. Returns number of dispatched chunks.
+    """
 
     course = Course.objects.get(id=course_id)
-    if not course.subscriptions.exists():
+    chunk_size = settings.COURSE_UPDATE_EMAILS_CHUNK_SIZE
+    recipient_ids = (
+        _subscribers(course_id)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    subject = "One of courses you are subscribed got an update"
+    message = f"Hi! Course {course.title} was updated!"
+    subtasks = [
+        send_course_update_emails.s(subject, message, course_id, chunk[0], chunk[-1])
+        for chunk in batched(recipient_ids, chunk_size)
+    ]
+    if not subtasks:
         print(f"Given course ({course}) doesn't have any subscriptions")
-        return
+        return 0
+
+    chord(subtasks)(report_course_update_emails.s(course_id))
+    return len(subtasks)
+
+
+def _subscribers(course_id: int):
+    return User.objects.filter(subscriptions__course_id=course_id)
+
+
+@shared_task(bind=True)
+def send_course_update_emails(
+    self,
+    subject: str,
+    message: str,
+    course_id: int,
+    first_pk: int,
+    last_pk: int,
+    recipients: list[str] | None = None,
+    sent: int = 0,
+) -> dict:
+    """
+    Sends a separate message to every subscriber with primary key
+    from first_pk to last_pk over one SMTP connection.
+
+    Failed recipients are retried up to COURSE_UPDATE_EMAILS_MAX_RETRIES times.
+    """
+
+    if recipients is None:
+        recipients = list(
+            _subscribers(course_id)
+            .filter(pk__range=(first_pk, last_pk))
+            .order_by("pk")
+            .values_list("email", flat=True)
+        )
 
-    send_mail(
-        "One of courses you are subscribed got an update",
-        f"Hi! Course {course.title} was updated!",
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[sub.user.email for sub in course.subscriptions],
-        fail_silently=False,
+    failed = []
+    connection = get_connection()
+    try:
+        connection.open()
+    except (smtplib.SMTPException, OSError) as e:
+        print(f"Failed to open a connection to the mail server: {e}")
+        failed = recipients
+    else:
+        try:
+            for recipient in recipients:
+                email = EmailMessage(
+                    subject,
+                    message,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[recipient],
+                    connection=connection,
+                )
+                try:
+                    sent += connection.send_messages([email])
+                except (smtplib.SMTPException, OSError):
+                    failed.append(recipient)
+        finally:
+            connection.close()
+
+    if failed and self.request.retries < settings.COURSE_UPDATE_EMAILS_MAX_RETRIES:
+        raise self.retry(
+            kwargs={"recipients": failed, "sent": sent},
+            countdown=settings.COURSE_UPDATE_EMAILS_RETRY_DELAY,
+        )
+
+    return {"sent": sent, "failed": len(failed)}
+
+
+@shared_task
+def report_course_update_emails(results: list[dict], course_id: int) -> dict:
+    """Sums up results of course update emails subtasks."""
+
+    report = {
+        "sent": sum(result["sent"] for result in results),
+        "failed": sum(result["failed"] for result in results),
+    }
+    print(
+        f"Course ({course_id}) update notification: "
+        f"{report['sent']} sent, {report['failed']} failed"
     )
+    return report
+
+
+def _pending_notification_key(course_id: int) -> str:
+    return f"materials:course:{course_id}:pending-notification"
+
+
+def _pending_notification_timeout() -> float:
+    return (
+        settings.COURSE_UPDATE_NOTIFICATION_QUIET_PERIOD
+        + settings.COURSE_UPDATE_NOTIFICATION_INTERVAL
+    ).total_seconds() * 2
+
+
+def schedule_course_update_notification(course_id: int) -> None:
+    """
+    Registers an update of given course.
+
+    Updates coming in a burst are coalesced into one notification,
+    that is delivered after a quiet period without updates.
+    """
+    key = _pending_notification_key(course_id)
+    updated_at = timezone.now().timestamp()
+
+    if cache.add(key, updated_at, _pending_notification_timeout()):
+        countdown = settings.COURSE_UPDATE_NOTIFICATION_QUIET_PERIOD.total_seconds()
+        transaction.on_commit(
+            lambda: deliver_course_update_notification.apply_async(
+                (course_id,), countdown=countdown
+            )
+        )
+    else:
+        cache.set(key, updated_at, _pending_notification_timeout())
 
 
 @shared_task
-def block_inactive_users() -> None:
-    """Blocks users that weren't active last 30 days."""
+def deliver_course_update_notification(course_id: int) -> None:
+    """
+    Delivers pending notification about given course update.
+
+    Postpones itself until the course has been quiet for a quiet period
+    and the previous notification is older than notifications interval.
+    """
+    key = _pending_notification_key(course_id)
+    updated_at = cache.get(key)
+    if updated_at is None:
+        return
+
+    course = Course.objects.filter(pk=course_id).only("notified_at").first()
+    if course is None:
+        cache.delete(key)
+        return
+
+    now = timezone.now()
+    quiet_period = settings.COURSE_UPDATE_NOTIFICATION_QUIET_PERIOD
+    wait = updated_at + quiet_period.total_seconds() - now.timestamp()
+    if course.notified_at:
+        interval = settings.COURSE_UPDATE_NOTIFICATION_INTERVAL
+        wait = max(wait, (course.notified_at + interval - now).total_seconds())
+
+    if wait > 0:
+        cache.touch(key, _pending_notification_timeout())
+        deliver_course_update_notification.apply_async((course_id,), countdown=wait)
+        return
+
+    cache.delete(key)
+    Course.objects.filter(pk=course_id).update(notified_at=now)
+    notify_about_course_update(course_id)
+
+
+_BLOCK_INACTIVE_USERS_LOCK_KEY = "materials:block-inactive-users:lock"
+_BLOCK_INACTIVE_USERS_CHECKPOINT_KEY = "materials:block-inactive-users:checkpoint"
+
+
+@shared_task(bind=True)
+def block_inactive_users(self) -> dict | None:
+    """
+    Blocks users that weren't active last 30 days.
+    Shared buffer of user activity is flushed to last_login first,
+    after a flush in progress elsewhere finishes.
+
+    Users are walked in primary key batches, each updated in its own short
+    transaction. Last processed key is checkpointed, so an interrupted run
+    is resumed by the next one. Overlapping runs are prevented by a lock.
+    """
+
+    lock_timeout = settings.INACTIVE_USERS_LOCK_TIMEOUT
+    token = acquire_lock(_BLOCK_INACTIVE_USERS_LOCK_KEY, lock_timeout)
+    if not token:
+        print("Inactive users are already being blocked by another run")
+        return None
+
+    started = time.monotonic()
+    scanned = updated = 0
+    try:
+        # buffered activity could save some users from being blocked,
+        # an in-process buffer of the worker doesn't have web requests activity
+        if get_activity_buffer().is_shared:
+            wait = settings.USER_ACTIVITY_FLUSH_LOCK_TIMEOUT
+            if flush_user_activity(wait=wait) is None:
+                print("User activity couldn't be flushed, inactive users are kept")
+                return None
+
+        month_ago = timezone.now() - settings.INACTIVE_USERS_PERIOD
+        selected_users = User.objects.filter(
+            last_login__lt=month_ago, is_active=True, is_staff=False, is_superuser=False
+        )
+        last_pk = cache.get(_BLOCK_INACTIVE_USERS_CHECKPOINT_KEY, 0)
+
+        while True:
+            batch = list(
+                selected_users.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[: settings.INACTIVE_USERS_BATCH_SIZE]
+            )
+            if not batch:
+                break
+
+            with transaction.atomic():
+                updated += selected_users.filter(pk__in=batch).update(is_active=False)
+            deny_user_tokens(batch)
+            scanned += len(batch)
+            last_pk = batch[-1]
+
+            cache.set(_BLOCK_INACTIVE_USERS_CHECKPOINT_KEY, last_pk, None)
+            cache.touch(_BLOCK_INACTIVE_USERS_LOCK_KEY, lock_timeout)
+            if self.request.id and not self.request.is_eager:
+                self.update_state(
+                    state="PROGRESS",
+                    meta={"scanned": scanned, "updated": updated, "last_pk": last_pk},
+                )
+
+        cache.delete(_BLOCK_INACTIVE_USERS_CHECKPOINT_KEY)
+    finally:
+        release_lock(_BLOCK_INACTIVE_USERS_LOCK_KEY, token)
 
-    month_ago = timezone.now() - timedelta(days=30)
-    selected_users = User.objects.filter(
-        last_login__lt=month_ago, is_active=True, is_staff=False, is_superuser=False
+    report = {
+        "scanned": scanned,
+        "updated": updated,
+        "duration": round(time.monotonic() - started, 3),
+    }
+    print(
+        f"Inactive users blocked: {report['updated']} of {report['scanned']} "
+        f"scanned in {report['duration']}s"
     )
-    selected_users.update(is_active=False)
+    return report
@@ -1,10 +1,29 @@
+import smtplib
+from datetime import timedelta
+from unittest import mock
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
+from django.core import mail
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from .models import Course, Lesson
+from .models import Course, Lesson, Subscription
+from .tasks import (
+    _BLOCK_INACTIVE_USERS_CHECKPOINT_KEY,
+    _BLOCK_INACTIVE_USERS_LOCK_KEY,
+    _pending_notification_key,
+    block_inactive_users,
+    deliver_course_update_notification,
+    notify_about_course_update,
+    report_course_update_emails,
+    schedule_course_update_notification,
+    send_course_update_emails,
+)
 
 User = get_user_model()
 
@@ -26,10 +45,10 @@ class CourseViewsTests(APITestCase):
 
         # courses
         self.course_owned = Course.objects.create(
-            title="Owner Course", owner=self.owner
+            title="Owner Course", owner=self.owner, price=100
         )
         self.course_other = Course.objects.create(
-            title="Other Course", owner=self.other_user
+            title="Other Course", owner=self.other_user, price=100
         )
 
         self.list_url = reverse("materials:course-list")
@@ -59,17 +78,23 @@ class CourseViewsTests(APITestCase):
     # CREATE
     def test_create_course_as_owner(self):
         self.authenticate(self.owner)
-        response = self.client.post(self.list_url, {"title": "Test Title"})
+        response = self.client.post(
+            self.list_url, {"title": "Test Title", "price": 100}
+        )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Course.objects.last().owner, self.owner)
 
     def test_create_course_as_moderator(self):
         self.authenticate(self.moderator)
-        response = self.client.post(self.list_url, {"title": "Test Title"})
+        response = self.client.post(
+            self.list_url, {"title": "Test Title", "price": 100}
+        )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
     def test_create_course_as_unauthenticated(self):
-        response = self.client.post(self.list_url, {"title": "Test Title"})
+        response = self.client.post(
+            self.list_url, {"title": "Test Title", "price": 100}
+        )
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     # RETRIEVE
@@ -167,6 +192,30 @@ class CourseViewsTests(APITestCase):
         self.course_owned.refresh_from_db()
         self.assertFalse(self.course_owned.subscriptions.exists())
 
+    def test_course_subscription_endpoint_response(self):
+        Subscription.objects.create(user=self.other_user, course=self.course_owned)
+        self.authenticate(self.owner)
+        url = reverse("materials:course-subscription", args=[self.course_owned.id])
+
+        with self.assertNumQueries(1):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["is_subscribed"])
+        self.assertEqual(response.data["subscribers_count"], 2)
+
+        with self.assertNumQueries(1):
+            response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["is_subscribed"])
+        self.assertEqual(response.data["subscribers_count"], 1)
+
+    def test_course_subscription_endpoint_non_existent_course(self):
+        self.authenticate(self.owner)
+        url = reverse("materials:course-subscription", args=[0])
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Subscription.objects.exists())
+
     def test_course_subscription_endpoint_as_unauthenticated(self):
         url = reverse("materials:course-subscription", args=[self.course_owned.id])
         response = self.client.post(url)
@@ -174,6 +223,212 @@ class CourseViewsTests(APITestCase):
         self.course_owned.refresh_from_db()
         self.assertFalse(self.course_owned.subscriptions.exists())
 
+    def test_course_subscription_endpoint_idempotency_key(self):
+        cache.clear()
+        self.authenticate(self.owner)
+        url = reverse("materials:course-subscription", args=[self.course_owned.id])
+
+        for _ in range(2):
+            response = self.client.post(url, headers={"Idempotency-Key": "key-1"})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.data["is_subscribed"])
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.assertTrue(self.course_owned.subscriptions.exists())
+
+        response = self.client.post(url, headers={"Idempotency-Key": "key-2"})
+        self.assertFalse(response.data["is_subscribed"])
+        self.assertFalse(self.course_owned.subscriptions.exists())
+
+
+class CourseQueryCountTests(APITestCase):
+    def setUp(self):
+        self.moderators_group = Group.objects.create(name="moderators")
+        self.moderator = User.objects.create_user(  # type: ignore
+            email="moder@model.com", password="pass"
+        )
+        self.moderator.groups.add(self.moderators_group)
+        self.owner = User.objects.create_user(email="owner@owner.com", password="pass")  # type: ignore
+
+        for i in range(5):
+            course = Course.objects.create(
+                title=f"Course {i}", owner=self.owner, price=100
+            )
+            for j in range(3):
+                Lesson.objects.create(
+                    title=f"Lesson {i}.{j}",
+                    owner=self.owner,
+                    video_url="https://youtube.com",
+                    course=course,
+                )
+            Subscription.objects.create(user=self.moderator, course=course)
+
+        self.course = Course.objects.first()
+        self.list_url = reverse("materials:course-list")
+
+    def test_list_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.moderator)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data["results"]
+        self.assertEqual(len(results), 5)
+        for course in results:
+            self.assertEqual(course["lessons_count"], 3)
+            self.assertEqual(len(course["lessons"]), 3)
+            self.assertTrue(course["is_subscribed"])
+
+    def test_list_subscription_status_is_per_user(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for course in response.data["results"]:
+            self.assertFalse(course["is_subscribed"])
+
+    def test_retrieve_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.moderator)
+        url = reverse("materials:course-detail", args=[self.course.id])
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["lessons_count"], 3)
+        self.assertTrue(response.data["is_subscribed"])
+
+
+class CourseDetailCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.moderators_group = Group.objects.create(name="moderators")
+        self.owner = User.objects.create_user(email="owner@owner.com", password="pass")  # type: ignore
+        self.moderator = User.objects.create_user(  # type: ignore
+            email="moder@model.com", password="pass"
+        )
+        self.moderator.groups.add(self.moderators_group)
+
+        self.course = Course.objects.create(
+            title="Owner Course", owner=self.owner, price=100
+        )
+        self.lesson = Lesson.objects.create(
+            title="Owner Lesson",
+            owner=self.owner,
+            video_url="https://youtube.com",
+            course=self.course,
+        )
+        Subscription.objects.create(user=self.moderator, course=self.course)
+
+        self.url = reverse("materials:course-detail", args=[self.course.id])
+
+    def retrieve(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_cached_detail_is_served_without_serializing(self):
+        first = self.retrieve(self.moderator)
+        with self.assertNumQueries(1):
+            second = self.retrieve(self.moderator)
+        self.assertEqual(first, second)
+
+    def test_subscription_status_is_per_user(self):
+        self.assertTrue(self.retrieve(self.moderator)["is_subscribed"])
+        self.assertFalse(self.retrieve(self.owner)["is_subscribed"])
+
+    def test_course_update_invalidates_cache(self):
+        self.retrieve(self.owner)
+        self.course.title = "UPDATED"
+        self.course.save()
+        self.assertEqual(self.retrieve(self.owner)["title"], "UPDATED")
+
+    def test_lesson_changes_invalidate_cache(self):
+        self.retrieve(self.owner)
+
+        self.lesson.title = "UPDATED"
+        self.lesson.save()
+        data = self.retrieve(self.owner)
+        self.assertEqual(data["lessons"][0]["title"], "UPDATED")
+
+        self.lesson.delete()
+        data = self.retrieve(self.owner)
+        self.assertEqual(data["lessons"], [])
+        self.assertEqual(data["lessons_count"], 0)
+
+    def test_bulk_lesson_create_invalidates_cache(self):
+        self.retrieve(self.owner)
+        response = self.client.post(
+            reverse("materials:lesson-bulk-create"),
+            [
+                {
+                    "title": "New Lesson",
+                    "video_url": "https://youtube.com",
+                    "course": self.course.id,
+                }
+            ],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.retrieve(self.owner)["lessons_count"], 2)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@owner.com", password="pass")  # type: ignore
+        for i in range(12):
+            course = Course.objects.create(
+                title=f"Course {i}", owner=self.owner, price=100
+            )
+            Lesson.objects.create(
+                title=f"Lesson {i}",
+                owner=self.owner,
+                video_url="https://youtube.com",
+                course=course,
+            )
+        self.client.force_authenticate(user=self.owner)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [item["id"] for item in response.data["results"]]
+            url = response.data["next"]
+        return ids
+
+    def test_courses_cursor_pagination(self):
+        url = reverse("materials:course-list") + "?pagination=cursor"
+        ids = self.walk(url)
+        self.assertEqual(
+            ids,
+            list(Course.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def test_courses_edited_while_paging(self):
+        response = self.client.get(
+            reverse("materials:course-list"), {"pagination": "cursor"}
+        )
+        ids = [item["id"] for item in response.data["results"]]
+        for course in Course.objects.all():
+            course.save()  # refreshes updated_at
+
+        ids += self.walk(response.data["next"])
+
+        self.assertEqual(
+            ids, list(Course.objects.order_by("id").values_list("id", flat=True))
+        )
+
+    def test_lessons_cursor_pagination(self):
+        url = reverse("materials:lesson-list") + "?pagination=cursor"
+        ids = self.walk(url)
+        self.assertEqual(
+            ids, list(Lesson.objects.order_by("id").values_list("id", flat=True))
+        )
+
+    def test_page_number_pagination_is_default(self):
+        response = self.client.get(reverse("materials:course-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 12)
+
 
 class LessonViewsTests(APITestCase):
     def setUp(self):
@@ -192,7 +447,7 @@ class LessonViewsTests(APITestCase):
 
         # courses and lessons
         self.course_owned = Course.objects.create(
-            title="Owner Course", owner=self.owner
+            title="Owner Course", owner=self.owner, price=100
         )
         self.lesson_owned = Lesson.objects.create(
             title="Owner Lesson",
@@ -202,7 +457,7 @@ class LessonViewsTests(APITestCase):
         )
 
         self.course_other = Course.objects.create(
-            title="Other Course", owner=self.other_user
+            title="Other Course", owner=self.other_user, price=100
         )
         self.lesson_other = Lesson.objects.create(
             title="Other Lesson", owner=self.other_user, course=self.course_other
@@ -372,3 +627,297 @@ class LessonViewsTests(APITestCase):
         url = reverse("materials:lesson-detail", args=[self.lesson_owned.id])
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class LessonBulkCreateTests(APITestCase):
+    def setUp(self):
+        self.moderators_group = Group.objects.create(name="moderators")
+        self.owner = User.objects.create_user(email="owner@owner.com", password="pass")  # type: ignore
+        self.moderator = User.objects.create_user(  # type: ignore
+            email="moder@model.com", password="pass"
+        )
+        self.moderator.groups.add(self.moderators_group)
+        self.other_user = User.objects.create_user(  # type: ignore
+            email="other@other.com", password="pass"
+        )
+
+        self.course_owned = Course.objects.create(
+            title="Owner Course", owner=self.owner, price=100
+        )
+        self.course_other = Course.objects.create(
+            title="Other Course", owner=self.other_user, price=100
+        )
+
+        self.url = reverse("materials:lesson-bulk-create")
+
+    def lessons(self, count, course):
+        return [
+            {
+                "title": f"Lesson {i}",
+                "video_url": "https://youtube.com",
+                "course": course.id,
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create(self):
+        self.client.force_authenticate(user=self.owner)
+        # roles, courses, savepoint, insert, release
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                self.url, self.lessons(50, self.course_owned), format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 50)
+        self.assertTrue(all(lesson["id"] for lesson in response.data))
+        self.assertEqual(Lesson.objects.filter(owner=self.owner).count(), 50)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        self.client.force_authenticate(user=self.owner)
+        lessons = self.lessons(3, self.course_owned)
+        lessons[1]["video_url"] = "https://UwU.com"
+        lessons[2]["course"] = self.course_other.id
+
+        response = self.client.post(self.url, lessons, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data[0], {})
+        self.assertIn("video_url", response.data[1])
+        self.assertIn("course", response.data[2])
+        self.assertFalse(Lesson.objects.exists())
+
+    def test_bulk_create_with_non_existent_course(self):
+        self.client.force_authenticate(user=self.owner)
+        lessons = self.lessons(1, self.course_owned)
+        lessons[0]["course"] = 0
+
+        response = self.client.post(self.url, lessons, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("course", response.data[0])
+
+    def test_bulk_create_empty(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(self.url, [], format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_as_moderator(self):
+        self.client.force_authenticate(user=self.moderator)
+        response = self.client.post(
+            self.url, self.lessons(1, self.course_owned), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_create_as_unauthenticated(self):
+        response = self.client.post(
+            self.url, self.lessons(1, self.course_owned), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CourseUpdateNotificationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email="owner@owner.com", password="pass")  # type: ignore
+        self.course = Course.objects.create(
+            title="Owner Course", owner=self.owner, price=100
+        )
+        self.lesson = Lesson.objects.create(
+            title="Owner Lesson",
+            owner=self.owner,
+            video_url="https://youtube.com",
+            course=self.course,
+        )
+        self.pending_key = _pending_notification_key(self.course.id)
+
+    def set_pending(self, updated_ago: timedelta):
+        cache.set(self.pending_key, (timezone.now() - updated_ago).timestamp())
+
+    @mock.patch.object(deliver_course_update_notification, "apply_async")
+    def test_burst_of_updates_is_scheduled_once(self, apply_async):
+        self.client.force_authenticate(user=self.owner)
+        course_url = reverse("materials:course-detail", args=[self.course.id])
+        lesson_url = reverse("materials:lesson-detail", args=[self.lesson.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(course_url, {"title": "UPDATED"})
+            self.client.patch(lesson_url, {"title": "UPDATED"})
+            self.client.patch(lesson_url, {"title": "UPDATED AGAIN"})
+
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.args[0], (self.course.id,))
+
+    @mock.patch("materials.tasks.notify_about_course_update")
+    @mock.patch.object(deliver_course_update_notification, "apply_async")
+    def test_delivery_waits_for_quiet_period(self, apply_async, notify):
+        self.set_pending(timedelta(minutes=1))
+
+        deliver_course_update_notification(self.course.id)
+
+        notify.assert_not_called()
+        apply_async.assert_called_once()
+        self.assertIsNotNone(cache.get(self.pending_key))
+
+    @mock.patch("materials.tasks.notify_about_course_update")
+    @mock.patch.object(deliver_course_update_notification, "apply_async")
+    def test_delivery_waits_for_notifications_interval(self, apply_async, notify):
+        Course.objects.filter(pk=self.course.pk).update(notified_at=timezone.now())
+        self.set_pending(timedelta(hours=1))
+
+        deliver_course_update_notification(self.course.id)
+
+        notify.assert_not_called()
+        apply_async.assert_called_once()
+
+    @mock.patch("materials.tasks.notify_about_course_update")
+    @mock.patch.object(deliver_course_update_notification, "apply_async")
+    def test_delivery_after_quiet_period(self, apply_async, notify):
+        self.set_pending(timedelta(hours=1))
+
+        deliver_course_update_notification(self.course.id)
+        deliver_course_update_notification(self.course.id)
+
+        notify.assert_called_once_with(self.course.id)
+        apply_async.assert_not_called()
+        self.assertIsNone(cache.get(self.pending_key))
+        self.course.refresh_from_db()
+        self.assertIsNotNone(self.course.notified_at)
+
+    @mock.patch.object(deliver_course_update_notification, "apply_async")
+    def test_schedule_is_deferred_until_commit(self, apply_async):
+        with self.captureOnCommitCallbacks() as callbacks:
+            schedule_course_update_notification(self.course.id)
+        apply_async.assert_not_called()
+        self.assertEqual(len(callbacks), 1)
+
+
+class CourseUpdateEmailsTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(email="owner@owner.com", password="pass")  # type: ignore
+        self.course = Course.objects.create(
+            title="Owner Course", owner=self.owner, price=100
+        )
+        self.emails = [f"user{i}@test.com" for i in range(5)]
+        for email in self.emails:
+            user = User.objects.create_user(email=email, password="pass")  # type: ignore
+            Subscription.objects.create(user=user, course=self.course)
+
+    @override_settings(COURSE_UPDATE_EMAILS_CHUNK_SIZE=2)
+    @mock.patch("materials.tasks.chord")
+    def test_recipients_are_split_into_chunks(self, chord):
+        self.assertEqual(notify_about_course_update(self.course.id), 3)
+
+        ids = list(
+            User.objects.filter(email__in=self.emails)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+        subtasks = chord.call_args.args[0]
+        self.assertEqual(
+            [subtask.args[2:] for subtask in subtasks],
+            [
+                (self.course.id, ids[0], ids[1]),
+                (self.course.id, ids[2], ids[3]),
+                (self.course.id, ids[4], ids[4]),
+            ],
+        )
+
+    @mock.patch("materials.tasks.chord")
+    def test_course_without_subscriptions(self, chord):
+        Subscription.objects.all().delete()
+        self.assertEqual(notify_about_course_update(self.course.id), 0)
+        chord.assert_not_called()
+
+    def send_chunk(self):
+        ids = User.objects.filter(email__in=self.emails).values_list("pk", flat=True)
+        return send_course_update_emails.apply(
+            args=("Subject", "Body", self.course.id, min(ids), max(ids))
+        )
+
+    def test_chunk_sends_separate_message_per_recipient(self):
+        result = self.send_chunk()
+
+        self.assertEqual(result.get(), {"sent": 5, "failed": 0})
+        self.assertEqual(
+            [email.to for email in mail.outbox], [[e] for e in self.emails]
+        )
+
+    @override_settings(COURSE_UPDATE_EMAILS_MAX_RETRIES=1)
+    def test_failed_recipients_are_retried(self):
+        attempts = []
+        send_messages = mail.get_connection().send_messages.__func__
+
+        def flaky_send_messages(connection, messages):
+            recipient = messages[0].to[0]
+            attempts.append(recipient)
+            if recipient == self.emails[0] or (
+                recipient == self.emails[1] and attempts.count(recipient) == 1
+            ):
+                raise smtplib.SMTPRecipientsRefused({})
+            return send_messages(connection, messages)
+
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            flaky_send_messages,
+        ):
+            result = self.send_chunk()
+
+        self.assertEqual(result.get(), {"sent": 4, "failed": 1})
+        self.assertEqual(attempts.count(self.emails[0]), 2)
+        self.assertEqual(attempts.count(self.emails[2]), 1)
+
+    def test_report(self):
+        report = report_course_update_emails(
+            [{"sent": 2, "failed": 0}, {"sent": 1, "failed": 1}], self.course.id
+        )
+        self.assertEqual(report, {"sent": 3, "failed": 1})
+
+
+@override_settings(INACTIVE_USERS_BATCH_SIZE=2)
+class BlockInactiveUsersTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        long_ago = timezone.now() - timedelta(days=31)
+        self.inactive = [
+            User.objects.create_user(  # type: ignore
+                email=f"inactive{i}@test.com", password="pass", last_login=long_ago
+            )
+            for i in range(5)
+        ]
+        self.active = User.objects.create_user(  # type: ignore
+            email="active@test.com", password="pass", last_login=timezone.now()
+        )
+        self.staff = User.objects.create_user(  # type: ignore
+            email="staff@test.com", password="pass", last_login=long_ago, is_staff=True
+        )
+
+    def active_emails(self):
+        return set(User.objects.filter(is_active=True).values_list("email", flat=True))
+
+    def test_blocks_inactive_users_in_batches(self):
+        # 3 batches of (select, savepoint, update, release) + final select
+        with self.assertNumQueries(13):
+            report = block_inactive_users.apply().get()
+
+        self.assertEqual(report["scanned"], 5)
+        self.assertEqual(report["updated"], 5)
+        self.assertEqual(self.active_emails(), {"active@test.com", "staff@test.com"})
+        self.assertIsNone(cache.get(_BLOCK_INACTIVE_USERS_CHECKPOINT_KEY))
+        self.assertIsNone(cache.get(_BLOCK_INACTIVE_USERS_LOCK_KEY))
+
+    def test_resumes_from_checkpoint(self):
+        cache.set(_BLOCK_INACTIVE_USERS_CHECKPOINT_KEY, self.inactive[2].pk)
+
+        report = block_inactive_users.apply().get()
+
+        self.assertEqual(report["updated"], 2)
+        self.assertEqual(
+            self.active_emails(),
+            {user.email for user in self.inactive[:3]}
+            | {"active@test.com", "staff@test.com"},
+        )
+
+    def test_overlapping_run_is_skipped(self):
+        cache.add(_BLOCK_INACTIVE_USERS_LOCK_KEY, "other run")
+
+        self.assertIsNone(block_inactive_users.apply().get())
+        self.assertEqual(len(self.active_emails()), 7)
+        self.assertEqual(cache.get(_BLOCK_INACTIVE_USERS_LOCK_KEY), "other run")
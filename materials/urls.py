@@ -6,6 +6,7 @@ from materials.views import CourseViewAPISet
 from .apps import MaterialsConfig
 from .views import (
     CourseSubscriptionAPIView,
+    LessonBulkCreateAPIView,
     LessonListCreateAPIView,
     LessonRetrieveUpdateDestroyAPIView,
 )
@@ -23,6 +24,7 @@ urlpatterns = [
         name="course-subscription",
     ),
     path("lessons/", LessonListCreateAPIView.as_view(), name="lesson-list"),
+    path("lessons/bulk/", LessonBulkCreateAPIView.as_view(), name="lesson-bulk-create"),
     path(
         "lessons/<int:pk>/",
         LessonRetrieveUpdateDestroyAPIView.as_view(),
@@ -1,61 +1,87 @@
-from datetime import timedelta
 from typing import override
 
-from django.shortcuts import get_object_or_404
-from django.utils import timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.http import Http404
 from rest_framework import generics, viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from materials.paginators import MaterialsPaginator
+from common.idempotency import idempotent
+from common.mixins import MemoizedObjectMixin
+from common.pagination import CursorPaginationMixin
+from materials.paginators import MaterialsCursorPaginator, MaterialsPaginator
 from users.permissions import IsModerator, IsOwner
+from users.roles import is_moderator
 
+from .cache import bump_lessons_version, get_course_detail_cache_key
+from .managers import get_lessons_prefetch
 from .models import Course, Lesson, Subscription
-from .serializers import CourseSerializer, LessonSerializer
-from .tasks import notify_about_course_update
+from .serializers import CourseSerializer, LessonBulkSerializer, LessonSerializer
+from .tasks import schedule_course_update_notification
 
 
 class CourseSubscriptionAPIView(APIView):
-    """Handles User Subscription to a Course."""
+    """
+    Handles User Subscription to a Course.
+    Toggles subscription and returns its new state with course subscribers count.
+    Supports "Idempotency-Key" header to make retries safe.
+    """
 
+    @idempotent
     def post(self, request, pk: int):
-        user = request.user
+        result = Subscription.objects.toggle(request.user.pk, pk)
+        if result is None:
+            raise Http404("No Course matches the given query.")
 
-        course = get_object_or_404(Course, pk=pk)
-        subscription = Subscription.objects.filter(user=user, course=course)
-
-        if subscription.exists():
-            subscription.delete()
-            message = "User unsubscribed"
-        else:
-            Subscription.objects.create(user=user, course=course)
+        is_subscribed, subscribers_count = result
+        if is_subscribed:
             message = "User successfully subscribed"
+        else:
+            message = "User unsubscribed"
 
-        return Response({"message": message})
+        return Response(
+            {
+                "message": message,
+                "is_subscribed": is_subscribed,
+                "subscribers_count": subscribers_count,
+            }
+        )
 
 
-class CourseViewAPISet(viewsets.ModelViewSet):
+class CourseViewAPISet(
+    MemoizedObjectMixin, CursorPaginationMixin, viewsets.ModelViewSet
+):
     """
     ViewSet for Course model.
 
     Returns all courses if user is a moderator, otherwise returns only its courses.
+    Paginated by page number, "?pagination=cursor" switches to cursor pagination.
     Moderators can't create/delete courses.
     Other methods are allowed only if user is owner or a moderator.
 
     Created courses linked to request.user automatically.
+
+    Course details are cached until the course or any of its lessons changes,
+    subscription status is added per user on top of the cached data.
     """
 
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
     pagination_class = MaterialsPaginator
+    cursor_pagination_class = MaterialsCursorPaginator
 
     @override
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="moderators").exists():
-            return Course.objects.all()
-        return Course.objects.filter(owner=user)
+        queryset = Course.objects.with_subscription_status(user)
+        if self.action != "retrieve":
+            queryset = queryset.with_lessons()
+        if is_moderator(user):
+            return queryset
+        return queryset.filter(owner=user.pk)
 
     @override
     def get_permissions(self):
@@ -69,6 +95,19 @@ class CourseViewAPISet(viewsets.ModelViewSet):
 
         return [permission() for permission in permission_classes]
 
+    @override
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+
+        key = get_course_detail_cache_key(instance, request)
+        data = cache.get(key)
+        if data is None:
+            prefetch_related_objects([instance], get_lessons_prefetch())
+            data = self.get_serializer(instance).data
+            cache.set(key, data, settings.COURSE_DETAIL_CACHE_TIMEOUT)
+
+        return Response({**data, "is_subscribed": instance.is_subscribed})
+
     @override
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -76,17 +115,15 @@ class CourseViewAPISet(viewsets.ModelViewSet):
     @override
     def perform_update(self, serializer):
         serializer.save()
-        course = serializer.instance
+        schedule_course_update_notification(serializer.instance.id)
 
-        if (timezone.now() - course.updated_at) > timedelta(hours=4):
-            notify_about_course_update.delay(course.id)
 
-
-class LessonListCreateAPIView(generics.ListCreateAPIView):
+class LessonListCreateAPIView(CursorPaginationMixin, generics.ListCreateAPIView):
     """
     List/Create View for Lesson model.
 
     Returns all lessons if user is a moderator, otherwise returns only its lessons.
+    Paginated by page number, "?pagination=cursor" switches to cursor pagination.
     Created lessons linked to request.user automatically.
 
     Moderators can't create lessons.
@@ -95,13 +132,14 @@ class LessonListCreateAPIView(generics.ListCreateAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     pagination_class = MaterialsPaginator
+    cursor_pagination_class = MaterialsCursorPaginator
 
     @override
     def get_queryset(self):
         user = self.request.user
-        if user.groups.filter(name="moderators").exists():
+        if is_moderator(user):
             return Lesson.objects.all()
-        return Lesson.objects.filter(owner=user)
+        return Lesson.objects.filter(owner=user.pk)
 
     @override
     def get_permissions(self):
@@ -118,7 +156,35 @@ class LessonListCreateAPIView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class LessonBulkCreateAPIView(generics.CreateAPIView):
+    """
+    Bulk Create View for Lesson model.
+
+    Accepts a list of lessons and creates all of them in a single transaction
+    or none of them, reporting errors per item.
+    Created lessons linked to request.user automatically.
+
+    Moderators can't create lessons.
+    """
+
+    serializer_class = LessonBulkSerializer
+    permission_classes = [IsAuthenticated, ~IsModerator]
+
+    @override
+    def get_serializer(self, *args, **kwargs):
+        kwargs["many"] = True
+        kwargs["allow_empty"] = False
+        kwargs["max_length"] = settings.LESSONS_BULK_CREATE_MAX_SIZE
+        return super().get_serializer(*args, **kwargs)
+
+    @override
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+
+class LessonRetrieveUpdateDestroyAPIView(
+    MemoizedObjectMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     Retrieve/Update/Destroy View for Lesson model.
 
@@ -141,8 +207,11 @@ class LessonRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     @override
     def perform_update(self, serializer):
+        previous_course_id = serializer.instance.course_id
         serializer.save()
-        course = serializer.instance.course
+        course_id = serializer.instance.course_id
+
+        if course_id != previous_course_id:
+            bump_lessons_version([previous_course_id])
 
-        if (timezone.now() - course.updated_at) > timedelta(hours=4):
-            notify_about_course_update.delay(course.id)
+        schedule_course_update_notification(course_id)
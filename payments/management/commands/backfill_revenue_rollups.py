@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from payments.models import Payment, RevenueRollup
+
+
+class Command(BaseCommand):
+    help = "Rebuilds revenue rollups from paid payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1_000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # incremental updates wait for the rebuild instead of being lost
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"LOCK TABLE {RevenueRollup._meta.db_table} IN EXCLUSIVE MODE"
+                    )
+
+            RevenueRollup.objects.all().delete()
+            totals = (
+                Payment.objects.filter(is_paid=True)
+                .annotate(day=TruncDate("timestamp"))
+                .values("course_id", "day", "method")
+                .annotate(total=Sum("amount"), paid=Count("id"))
+                .order_by()
+            )
+            rollups = RevenueRollup.objects.bulk_create(
+                (
+                    RevenueRollup(
+                        course_id=row["course_id"],
+                        day=row["day"],
+                        method=row["method"],
+                        amount=row["total"],
+                        count=row["paid"],
+                    )
+                    for row in totals.iterator()
+                ),
+                batch_size=options["batch_size"],
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Created {len(rollups)} revenue rollups.")
+        )
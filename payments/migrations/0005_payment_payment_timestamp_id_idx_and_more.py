@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0004_course_course_updated_at_id_idx_and_more"),
+        ("payments", "0004_alter_payment_payment_url"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["timestamp", "id"], name="payment_timestamp_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["user", "timestamp", "id"], name="payment_user_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["course", "timestamp"], name="payment_course_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["lesson", "timestamp"], name="payment_lesson_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["method", "timestamp"], name="payment_method_timestamp_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                condition=models.Q(("is_paid", False), ("method", "stripe")),
+                fields=["timestamp"],
+                name="payment_unpaid_stripe_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("stripe_session_id__isnull", False)),
+                fields=("stripe_session_id",),
+                name="unique_payment_stripe_session",
+            ),
+        ),
+    ]
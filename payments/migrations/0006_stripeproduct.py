@@ -0,0 +1,40 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0005_course_notified_at"),
+        ("payments", "0005_payment_payment_timestamp_id_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StripeProduct",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("product_id", models.CharField(max_length=255)),
+                ("price_id", models.CharField(max_length=255)),
+                ("unit_amount", models.PositiveIntegerField()),
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stripe_product",
+                        to="materials.course",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0006_stripeproduct"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="checkout_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                max_length=8,
+                null=True,
+            ),
+        ),
+    ]
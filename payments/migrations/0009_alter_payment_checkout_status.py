@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0008_stripeevent"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="checkout_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                    ("expired", "Expired"),
+                ],
+                max_length=8,
+                null=True,
+            ),
+        ),
+    ]
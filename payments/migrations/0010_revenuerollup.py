@@ -0,0 +1,75 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0005_course_notified_at"),
+        ("payments", "0009_alter_payment_checkout_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevenueRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "method",
+                    models.CharField(
+                        choices=[
+                            ("cash", "Cash"),
+                            ("transfer", "Transfer"),
+                            ("stripe", "Stripe"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="materials.course",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["day"],
+                "indexes": [
+                    models.Index(fields=["day"], name="revenue_rollup_day_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("course__isnull", False)),
+                        fields=("course", "day", "method"),
+                        name="unique_revenue_rollup_course_day_method",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("course__isnull", True)),
+                        fields=("day", "method"),
+                        name="unique_revenue_rollup_day_method",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def detach_deleted_courses_rollups(apps, schema_editor):
+    """Merges rollups of already deleted courses into rollups without a course."""
+    Course = apps.get_model("materials", "Course")
+    RevenueRollup = apps.get_model("payments", "RevenueRollup")
+
+    dangling = RevenueRollup.objects.filter(course_id__isnull=False).exclude(
+        course_id__in=Course.objects.values("pk")
+    )
+    for rollup in dangling.order_by("pk"):
+        detached, _ = RevenueRollup.objects.get_or_create(
+            course_id=None, day=rollup.day, method=rollup.method
+        )
+        RevenueRollup.objects.filter(pk=detached.pk).update(
+            amount=F("amount") + rollup.amount, count=F("count") + rollup.count
+        )
+        rollup.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0006_remove_course_updated_at_indexes"),
+        ("payments", "0010_revenuerollup"),
+    ]
+
+    operations = [
+        migrations.RunPython(detach_deleted_courses_rollups, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="revenuerollup",
+            name="course",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="materials.course",
+            ),
+        ),
+    ]
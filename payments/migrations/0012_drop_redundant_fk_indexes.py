@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2026-10-18 07:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("materials", "0007_drop_redundant_fk_indexes"),
+        ("payments", "0011_revenuerollup_course_set_null"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="payment",
+            name="course",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="materials.course",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="lesson",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="materials.lesson",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
@@ -12,18 +12,126 @@ class Payment(models.Model):
         TRANSFER = "transfer", "Transfer"
         STRIPE = "stripe", "Stripe"
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="payments")
+    class CheckoutStatus(models.TextChoices):
+        PENDING = "pending", "Pending"
+        READY = "ready", "Ready"
+        FAILED = "failed", "Failed"
+        EXPIRED = "expired", "Expired"
+
+    # foreign keys are covered by composite indexes below
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="payments", db_index=False
+    )
     timestamp = models.DateTimeField(auto_now_add=True)
-    course = models.ForeignKey(Course, on_delete=models.SET_NULL, blank=True, null=True)
-    lesson = models.ForeignKey(Lesson, on_delete=models.SET_NULL, blank=True, null=True)
+    course = models.ForeignKey(
+        Course, on_delete=models.SET_NULL, blank=True, null=True, db_index=False
+    )
+    lesson = models.ForeignKey(
+        Lesson, on_delete=models.SET_NULL, blank=True, null=True, db_index=False
+    )
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     method = models.CharField(max_length=8, choices=PaymentMethod)
     stripe_session_id = models.CharField(max_length=255, blank=True, null=True)
     payment_url = models.URLField(max_length=1000, blank=True, null=True)
+    checkout_status = models.CharField(
+        max_length=8, choices=CheckoutStatus, blank=True, null=True
+    )
     is_paid = models.BooleanField(default=False)
 
     class Meta:
         ordering = ["timestamp"]
+        indexes = [
+            models.Index(fields=["timestamp", "id"], name="payment_timestamp_id_idx"),
+            models.Index(
+                fields=["user", "timestamp", "id"], name="payment_user_timestamp_idx"
+            ),
+            models.Index(
+                fields=["course", "timestamp"], name="payment_course_timestamp_idx"
+            ),
+            models.Index(
+                fields=["lesson", "timestamp"], name="payment_lesson_timestamp_idx"
+            ),
+            models.Index(
+                fields=["method", "timestamp"], name="payment_method_timestamp_idx"
+            ),
+            models.Index(
+                fields=["timestamp"],
+                condition=models.Q(is_paid=False, method="stripe"),
+                name="payment_unpaid_stripe_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["stripe_session_id"],
+                condition=models.Q(stripe_session_id__isnull=False),
+                name="unique_payment_stripe_session",
+            )
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} - {self.amount} usd. ({self.method})"
+
+
+class StripeEvent(models.Model):
+    """Processed stripe webhook event, stored to ignore redeliveries."""
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=255)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f"{self.type} ({self.event_id})"
+
+
+class StripeProduct(models.Model):
+    """Stripe product and its current price created for a course."""
+
+    course = models.OneToOneField(
+        Course, on_delete=models.CASCADE, related_name="stripe_product"
+    )
+    product_id = models.CharField(max_length=255)
+    price_id = models.CharField(max_length=255)
+    unit_amount = models.PositiveIntegerField()
+
+    def __str__(self) -> str:
+        return f"{self.course} - {self.product_id} ({self.price_id})"
+
+
+class RevenueRollup(models.Model):
+    """
+    Paid amount and count of payments per course, day and method.
+    Day is a local date of payment creation.
+    """
+
+    # revenue of deleted courses is merged into rollups without a course,
+    # see payments.signals
+    course = models.ForeignKey(
+        Course,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+    )
+    day = models.DateField()
+    method = models.CharField(max_length=8, choices=Payment.PaymentMethod)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        indexes = [models.Index(fields=["day"], name="revenue_rollup_day_idx")]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["course", "day", "method"],
+                condition=models.Q(course__isnull=False),
+                name="unique_revenue_rollup_course_day_method",
+            ),
+            models.UniqueConstraint(
+                fields=["day", "method"],
+                condition=models.Q(course__isnull=True),
+                name="unique_revenue_rollup_day_method",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.course_id} - {self.day} - {self.amount} usd. ({self.method})"
@@ -0,0 +1,20 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class PaymentPaginator(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class PaymentCursorPaginator(CursorPagination):
+    """
+    Cursor pagination without total count.
+    Cursor is positioned on the first ordering field only and ties are
+    skipped by offset, so it's the unique id rather than timestamp.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("id",)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Payment
+from .models import Payment, RevenueRollup
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -16,6 +16,13 @@ class PaymentSerializer(serializers.ModelSerializer):
             "method",
             "stripe_session_id",
             "payment_url",
+            "checkout_status",
             "is_paid",
         ]
         read_only_fields = [f for f in fields if f != "course"]
+
+
+class RevenueRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RevenueRollup
+        fields = ["course", "day", "method", "amount", "count"]
@@ -1,36 +1,276 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
 import stripe
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, QuerySet
+from django.utils import timezone
 from stripe.checkout import Session
 
-stripe.api_key = settings.STRIPE_API_KEY
+from common.locks import acquire_lock, backoff, release_lock
+from materials.models import Course
+
+from .models import Payment, RevenueRollup, StripeEvent, StripeProduct
+from .stripe_client import get_stripe_client, instrumented
+
+PAID_SESSION_EVENTS = {
+    "checkout.session.completed",
+    "checkout.session.async_payment_succeeded",
+}
 
 
+@instrumented
 def create_stripe_product(name: str, description: str) -> str:
     """Creates a stripe product."""
-    product = stripe.Product.create(name=name, description=description)
+    product = get_stripe_client().products.create(
+        params={"name": name, "description": description}
+    )
     return product.id
 
 
+@instrumented
 def create_stripe_price(product_id: str, amount: int) -> str:
     """Creates a price for a given product. Amount should be in penny."""
-    price = stripe.Price.create(product=product_id, unit_amount=amount, currency="usd")
+    price = get_stripe_client().prices.create(
+        params={"product": product_id, "unit_amount": amount, "currency": "usd"}
+    )
     return price.id
 
 
+@instrumented
 def create_stripe_checkout_session(
     price_id: str, success_url: str, cancel_url: str
 ) -> Session:
     """Creates a stripe checkout session."""
-    session = stripe.checkout.Session.create(
-        payment_method_types=["card"],
-        line_items=[{"price": price_id, "quantity": 1}],
-        mode="payment",
-        success_url=success_url,
-        cancel_url=cancel_url,
+    session = get_stripe_client().checkout.sessions.create(
+        params={
+            "payment_method_types": ["card"],
+            "line_items": [{"price": price_id, "quantity": 1}],
+            "mode": "payment",
+            "success_url": success_url,
+            "cancel_url": cancel_url,
+        }
     )
     return session
 
 
+@instrumented
 def fetch_stripe_session(session_id: str) -> Session:
     """Fetches and returns stripe session by a given id."""
-    return stripe.checkout.Session.retrieve(session_id)
+    return get_stripe_client().checkout.sessions.retrieve(session_id)
+
+
+def fetch_stripe_sessions(
+    session_ids: list[str], concurrency: int
+) -> dict[str, Session | stripe.StripeError]:
+    """
+    Fetches stripe sessions by given ids with up to `concurrency` parallel requests.
+    Returns mapping of session id to a session or an error of its request.
+    """
+
+    def fetch(session_id: str) -> Session | stripe.StripeError:
+        try:
+            return fetch_stripe_session(session_id)
+        except stripe.StripeError as e:
+            return e
+
+    if not session_ids:
+        return {}
+    max_workers = min(len(session_ids), concurrency)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(session_ids, executor.map(fetch, session_ids)))
+
+
+def _session_status_key(session_id: str) -> str:
+    return f"payments:session:{session_id}:status"
+
+
+def get_stripe_session_payment_status(session_id: str) -> str:
+    """
+    Returns payment status of a stripe session.
+
+    Status is cached for a few seconds and concurrent calls for the same session
+    are collapsed into a single request to stripe.
+    """
+    key = _session_status_key(session_id)
+    lock_key = f"{key}:lock"
+    lock_timeout = settings.STRIPE_SESSION_STATUS_LOCK_TIMEOUT
+
+    for _ in backoff(lock_timeout):
+        payment_status = cache.get(key)
+        if payment_status is not None:
+            return payment_status
+
+        token = acquire_lock(lock_key, lock_timeout)
+        if token:
+            try:
+                payment_status = fetch_stripe_session(session_id).payment_status
+                cache.set(
+                    key, payment_status, settings.STRIPE_SESSION_STATUS_CACHE_TIMEOUT
+                )
+                return payment_status
+            finally:
+                release_lock(lock_key, token)
+
+    # the other request takes too long, don't wait for it anymore
+    return fetch_stripe_session(session_id).payment_status
+
+
+def get_course_stripe_price_id(course: Course) -> str:
+    """
+    Returns id of a stripe price for a given course.
+    Stripe product is created once per course,
+    a new price is created only if course price has changed.
+
+    Concurrent checkouts of the same course wait for the one creating
+    the price, which calls stripe outside of any transaction.
+    """
+    amount = int(course.price * 100)
+    lock_key = f"payments:course:{course.pk}:stripe-price:lock"
+    lock_timeout = settings.STRIPE_PRICE_LOCK_TIMEOUT
+
+    token = None
+    for _ in backoff(lock_timeout):
+        product = StripeProduct.objects.filter(course=course).first()
+        if product and product.unit_amount == amount:
+            return product.price_id
+
+        token = acquire_lock(lock_key, lock_timeout)
+        if token:
+            break
+
+    try:
+        if token:
+            # the price could be created right before the lock was taken
+            product = StripeProduct.objects.filter(course=course).first()
+            if product and product.unit_amount == amount:
+                return product.price_id
+
+        if product is None:
+            product_id = create_stripe_product(course.title, course.description)
+        else:
+            product_id = product.product_id
+        price_id = create_stripe_price(product_id, amount)
+
+        StripeProduct.objects.update_or_create(
+            course=course,
+            defaults={
+                "product_id": product_id,
+                "price_id": price_id,
+                "unit_amount": amount,
+            },
+        )
+        return price_id
+    finally:
+        if token:
+            release_lock(lock_key, token)
+
+
+def construct_stripe_event(payload: bytes, signature: str) -> stripe.Event:
+    """
+    Verifies signature of a stripe webhook payload and returns its event.
+    Raises ValueError or stripe.SignatureVerificationError if payload is invalid.
+    """
+    return stripe.Webhook.construct_event(
+        payload, signature, settings.STRIPE_WEBHOOK_SECRET
+    )
+
+
+def handle_stripe_event(event: stripe.Event) -> bool:
+    """
+    Applies a stripe webhook event to payments.
+    Returns False if the event was already processed.
+    """
+    with transaction.atomic():
+        _, created = StripeEvent.objects.get_or_create(
+            event_id=event.id, defaults={"type": event.type}
+        )
+        if not created:
+            return False
+
+        session = event.data.object
+        if event.type in PAID_SESSION_EVENTS:
+            if session.payment_status == "paid":
+                mark_payments_paid(Payment.objects.filter(stripe_session_id=session.id))
+        elif event.type == "checkout.session.expired":
+            Payment.objects.filter(stripe_session_id=session.id, is_paid=False).update(
+                checkout_status=Payment.CheckoutStatus.EXPIRED
+            )
+
+    return True
+
+
+def mark_payments_paid(payments: QuerySet[Payment]) -> int:
+    """
+    Marks unpaid payments of a given queryset as paid
+    and adds them to revenue rollups.
+    Returns number of payments marked as paid.
+    """
+    with transaction.atomic():
+        paid = list(
+            payments.select_for_update()
+            .filter(is_paid=False)
+            .order_by("pk")
+            .values("id", "course_id", "method", "amount", "timestamp")
+        )
+        if not paid:
+            return 0
+
+        Payment.objects.filter(pk__in=[p["id"] for p in paid]).update(is_paid=True)
+        add_to_revenue_rollups(paid)
+
+    return len(paid)
+
+
+def add_to_revenue_rollups(payments: list[dict]) -> None:
+    """
+    Adds amount and count of given payment values to their revenue rollups.
+    Expects "course_id", "method", "amount" and "timestamp" of every payment.
+    """
+    totals = defaultdict(lambda: [Decimal(0), 0])
+    for payment in payments:
+        key = (
+            payment["course_id"],
+            timezone.localdate(payment["timestamp"]),
+            payment["method"],
+        )
+        totals[key][0] += payment["amount"]
+        totals[key][1] += 1
+
+    _increment_revenue_rollups(totals)
+
+
+def detach_revenue_rollups(course_id: int) -> None:
+    """
+    Merges revenue rollups of a course being deleted into rollups without
+    a course, the way backfill_revenue_rollups groups its payments.
+    """
+    rollups = list(
+        RevenueRollup.objects.select_for_update()
+        .filter(course_id=course_id)
+        .order_by("pk")
+        .values("pk", "day", "method", "amount", "count")
+    )
+    if not rollups:
+        return
+
+    RevenueRollup.objects.filter(pk__in=[r["pk"] for r in rollups]).delete()
+    _increment_revenue_rollups(
+        {(None, r["day"], r["method"]): (r["amount"], r["count"]) for r in rollups}
+    )
+
+
+def _increment_revenue_rollups(totals: dict) -> None:
+    # rows are locked in the same order to avoid deadlocks
+    for (course_id, day, method), (amount, count) in sorted(
+        totals.items(), key=lambda item: (item[0][0] or 0, item[0][1], item[0][2])
+    ):
+        rollup, _ = RevenueRollup.objects.get_or_create(
+            course_id=course_id, day=day, method=method
+        )
+        RevenueRollup.objects.filter(pk=rollup.pk).update(
+            amount=F("amount") + amount, count=F("count") + count
+        )
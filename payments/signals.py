@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from materials.models import Course
+
+from .models import Payment
+from .services import add_to_revenue_rollups, detach_revenue_rollups
+
+
+@receiver(post_save, sender=Payment)
+def add_paid_payment_to_revenue_rollups(sender, instance, created, **kwargs):
+    # payments paid later are added by mark_payments_paid
+    if created and instance.is_paid:
+        add_to_revenue_rollups(
+            [
+                {
+                    "course_id": instance.course_id,
+                    "method": instance.method,
+                    "amount": instance.amount,
+                    "timestamp": instance.timestamp,
+                }
+            ]
+        )
+
+
+@receiver(pre_delete, sender=Course)
+def detach_revenue_rollups_on_course_delete(sender, instance, **kwargs):
+    detach_revenue_rollups(instance.pk)
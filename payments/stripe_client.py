@@ -0,0 +1,139 @@
+import functools
+import threading
+import time
+from typing import Callable
+
+import requests
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+# errors meaning stripe is unavailable, client errors don't open the circuit
+CIRCUIT_FAILURE_ERRORS = (
+    stripe.APIConnectionError,
+    stripe.APIError,
+    stripe.RateLimitError,
+)
+METRICS = ("calls", "errors", "rejected", "latency_ms")
+
+_CIRCUIT_FAILURES_KEY = "payments:stripe:circuit:failures"
+_CIRCUIT_OPEN_KEY = "payments:stripe:circuit:open"
+
+_client = None
+_client_lock = threading.Lock()
+_instrumented_functions: list[str] = []
+
+
+class StripeCircuitOpenError(stripe.StripeError):
+    """Raised instead of calling stripe while it's considered unavailable."""
+
+
+def get_stripe_client() -> stripe.StripeClient:
+    """
+    Returns stripe client shared by the process.
+    Client keeps pooled connections and uses configured timeout and retries.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=settings.STRIPE_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+
+            _client = stripe.StripeClient(
+                settings.STRIPE_API_KEY,
+                http_client=stripe.RequestsClient(
+                    timeout=settings.STRIPE_TIMEOUT, session=session
+                ),
+                max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+            )
+    return _client
+
+
+def is_circuit_open() -> bool:
+    return bool(cache.get(_CIRCUIT_OPEN_KEY))
+
+
+def _incr(key: str, delta: int, timeout: float | None) -> int:
+    """Increments a counter, creating it if it's missing, evicted or reset."""
+    while True:
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            if cache.add(key, delta, timeout):
+                return delta
+
+
+def _record_failure() -> None:
+    failures = _incr(_CIRCUIT_FAILURES_KEY, 1, settings.STRIPE_CIRCUIT_WINDOW)
+    if failures >= settings.STRIPE_CIRCUIT_FAILURE_THRESHOLD:
+        print(f"Stripe circuit is open after {failures} failures")
+        cache.set(_CIRCUIT_OPEN_KEY, True, settings.STRIPE_CIRCUIT_RESET_TIMEOUT)
+        cache.delete(_CIRCUIT_FAILURES_KEY)
+
+
+def _metric_key(name: str, metric: str) -> str:
+    return f"payments:stripe:metrics:{name}:{metric}"
+
+
+def _incr_metric(name: str, metric: str, delta: int = 1) -> None:
+    _incr(_metric_key(name, metric), delta, None)
+
+
+def instrumented(func: Callable) -> Callable:
+    """
+    Wraps a function calling stripe.
+
+    Collects calls, errors and latency of the function and fails fast with
+    StripeCircuitOpenError while the circuit is open. The circuit opens for
+    STRIPE_CIRCUIT_RESET_TIMEOUT seconds after STRIPE_CIRCUIT_FAILURE_THRESHOLD
+    failures within STRIPE_CIRCUIT_WINDOW seconds.
+    """
+    name = func.__name__
+    _instrumented_functions.append(name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if is_circuit_open():
+            _incr_metric(name, "rejected")
+            raise StripeCircuitOpenError("Stripe is temporarily unavailable")
+
+        started_at = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        except CIRCUIT_FAILURE_ERRORS:
+            _incr_metric(name, "errors")
+            _record_failure()
+            raise
+        finally:
+            _incr_metric(name, "calls")
+            _incr_metric(
+                name, "latency_ms", int((time.monotonic() - started_at) * 1000)
+            )
+
+    return wrapper
+
+
+def get_stripe_metrics() -> dict:
+    """Returns circuit state and collected metrics of instrumented functions."""
+    metrics = {}
+    for name in _instrumented_functions:
+        values = cache.get_many([_metric_key(name, metric) for metric in METRICS])
+        metrics[name] = {
+            metric: values.get(_metric_key(name, metric), 0) for metric in METRICS
+        }
+        calls = metrics[name]["calls"]
+        metrics[name]["avg_latency_ms"] = (
+            round(metrics[name]["latency_ms"] / calls, 1) if calls else None
+        )
+
+    return {
+        "circuit": {
+            "open": is_circuit_open(),
+            "failures": cache.get(_CIRCUIT_FAILURES_KEY, 0),
+        },
+        "functions": metrics,
+    }
@@ -0,0 +1,126 @@
+import time
+
+import stripe
+from celery import shared_task
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Payment
+from .services import (
+    create_stripe_checkout_session,
+    fetch_stripe_sessions,
+    get_course_stripe_price_id,
+    mark_payments_paid,
+)
+
+
+@shared_task(bind=True)
+def create_payment_checkout_session(
+    self, payment_id: int, success_url: str, cancel_url: str
+) -> str:
+    """
+    Creates stripe checkout session for a pending payment.
+
+    Failed stripe calls are retried with exponential backoff,
+    payment is marked as failed once retries are exhausted
+    or on any other error. Returns resulting checkout status.
+    """
+
+    payment = Payment.objects.select_related("course").get(pk=payment_id)
+    if payment.checkout_status != Payment.CheckoutStatus.PENDING:
+        return payment.checkout_status
+
+    if payment.course is None:
+        print(f"Payment ({payment_id}) course was deleted")
+        payment.checkout_status = Payment.CheckoutStatus.FAILED
+        payment.save(update_fields=["checkout_status"])
+        return payment.checkout_status
+
+    try:
+        price_id = get_course_stripe_price_id(payment.course)
+        session = create_stripe_checkout_session(price_id, success_url, cancel_url)
+    except stripe.StripeError as e:
+        retries = self.request.retries
+        if retries < settings.PAYMENT_CHECKOUT_MAX_RETRIES:
+            raise self.retry(
+                exc=e, countdown=settings.PAYMENT_CHECKOUT_RETRY_DELAY * 2**retries
+            )
+        print(f"Failed to create a stripe checkout session for ({payment_id}): {e}")
+        payment.checkout_status = Payment.CheckoutStatus.FAILED
+        payment.save(update_fields=["checkout_status"])
+        return payment.checkout_status
+    except Exception:
+        # nothing else would resolve the pending payment
+        payment.checkout_status = Payment.CheckoutStatus.FAILED
+        payment.save(update_fields=["checkout_status"])
+        raise
+
+    payment.stripe_session_id = session.id
+    payment.payment_url = session.url
+    payment.checkout_status = Payment.CheckoutStatus.READY
+    payment.save(update_fields=["stripe_session_id", "payment_url", "checkout_status"])
+    return payment.checkout_status
+
+
+@shared_task
+def reconcile_unpaid_payments() -> dict:
+    """
+    Syncs unpaid stripe payments created within PAYMENTS_RECONCILIATION_WINDOW
+    with their checkout sessions.
+
+    Payments are processed in batches by primary key, sessions of a batch are
+    fetched concurrently. Paid payments are marked as paid, payments with
+    expired sessions get expired checkout status.
+    Returns report of reconciled payments.
+    """
+
+    started_at = time.monotonic()
+    batch_size = settings.PAYMENTS_RECONCILIATION_BATCH_SIZE
+    payments = (
+        Payment.objects.filter(
+            method=Payment.PaymentMethod.STRIPE,
+            is_paid=False,
+            stripe_session_id__isnull=False,
+            timestamp__gte=timezone.now() - settings.PAYMENTS_RECONCILIATION_WINDOW,
+        )
+        .exclude(checkout_status=Payment.CheckoutStatus.EXPIRED)
+        .only("id", "stripe_session_id", "checkout_status")
+        .order_by("pk")
+    )
+
+    report = {"checked": 0, "paid": 0, "expired": 0, "failed": 0}
+    last_pk = 0
+    while batch := list(payments.filter(pk__gt=last_pk)[:batch_size]):
+        last_pk = batch[-1].pk
+        sessions = fetch_stripe_sessions(
+            [p.stripe_session_id for p in batch],
+            settings.PAYMENTS_RECONCILIATION_CONCURRENCY,
+        )
+
+        paid, expired = [], []
+        for payment in batch:
+            session = sessions[payment.stripe_session_id]
+            if isinstance(session, stripe.StripeError):
+                print(
+                    "Failed to retrieve a stripe checkout session "
+                    f"{payment.stripe_session_id}: {session}"
+                )
+                report["failed"] += 1
+            elif session.payment_status == "paid":
+                paid.append(payment.pk)
+            elif session.status == "expired":
+                payment.checkout_status = Payment.CheckoutStatus.EXPIRED
+                expired.append(payment)
+
+        report["paid"] += mark_payments_paid(Payment.objects.filter(pk__in=paid))
+        report["expired"] += len(expired)
+        Payment.objects.bulk_update(expired, ["checkout_status"])
+        report["checked"] += len(batch)
+
+    report["duration"] = round(time.monotonic() - started_at, 3)
+    print(
+        f"Reconciled {report['checked']} unpaid payments: {report['paid']} paid, "
+        f"{report['expired']} expired, {report['failed']} failed "
+        f"in {report['duration']}s"
+    )
+    return report
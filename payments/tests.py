@@ -1,3 +1,828 @@
-from django.test import TestCase
+import csv
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import stripe
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from common.idempotency import get_idempotency_cache_key
+from materials.models import Course
+
+from .models import Payment, RevenueRollup, StripeEvent, StripeProduct
+from .services import (
+    fetch_stripe_session,
+    get_course_stripe_price_id,
+    get_stripe_session_payment_status,
+    mark_payments_paid,
+)
+from .stripe_client import StripeCircuitOpenError
+from .tasks import create_payment_checkout_session, reconcile_unpaid_payments
+
+User = get_user_model()
+
+
+class PaymentListViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        for _ in range(25):
+            Payment.objects.create(
+                user=self.user, amount=100, method=Payment.PaymentMethod.CASH
+            )
+        self.list_url = reverse("payments:payment-list")
+        self.client.force_authenticate(user=self.user)
+
+    def test_cursor_pagination(self):
+        url = self.list_url + "?pagination=cursor"
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            ids += [payment["id"] for payment in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(
+            ids,
+            list(Payment.objects.order_by("id").values_list("id", flat=True)),
+        )
+
+    def test_cursor_pagination_keeps_filters(self):
+        response = self.client.get(
+            self.list_url, {"pagination": "cursor", "method": "stripe"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"], [])
+
+    def test_paginated_by_default(self):
+        response = self.client.get(self.list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 25)
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_scoped_to_user(self):
+        other = User.objects.create_user(email="other@test.com", password="pass")  # type: ignore
+        Payment.objects.create(user=other, amount=100, method="cash")
+
+        self.client.force_authenticate(user=other)
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data["count"], 1)
+
+        other.is_staff = True
+        response = self.client.get(self.list_url)
+        self.assertEqual(response.data["count"], 26)
+
+    def test_export_csv(self):
+        Payment.objects.create(user=self.user, amount=50, method="transfer")
+        url = reverse("payments:payment-export", args=["csv"])
+
+        response = self.client.get(url, {"method": "transfer"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(
+            csv.reader(b"".join(response.streaming_content).decode().splitlines())
+        )
+        self.assertEqual(rows[0][:3], ["id", "user", "timestamp"])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][5:7], ["50.00", "transfer"])
+
+    def test_export_ndjson(self):
+        url = reverse("payments:payment-export", args=["ndjson"])
+
+        response = self.client.get(url, {"ordering": "-timestamp"})
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        payments = [json.loads(line) for line in lines]
+        self.assertEqual(len(payments), 25)
+        self.assertEqual(
+            [payment["id"] for payment in payments],
+            list(Payment.objects.order_by("-timestamp").values_list("id", flat=True)),
+        )
+        self.assertEqual(payments[0]["user"], self.user.pk)
+
+    def test_export_unknown_format(self):
+        url = reverse("payments:payment-export", args=["xml"])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+
+def fake_checkout_session(price_id, success_url, cancel_url):
+    session_id = f"cs_test_{Payment.objects.count()}"
+    return SimpleNamespace(id=session_id, url=f"https://stripe.com/{session_id}")
+
+
+@mock.patch(
+    "payments.views.create_stripe_checkout_session",
+    side_effect=fake_checkout_session,
+)
+@mock.patch("payments.services.create_stripe_price", return_value="price_1")
+@mock.patch("payments.services.create_stripe_product", return_value="prod_1")
+class PaymentCreateViewTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.course = Course.objects.create(title="Course", owner=self.user, price=100)
+        self.create_url = reverse("payments:payment-create")
+        self.client.force_authenticate(user=self.user)
+
+    def test_reuses_product_and_price(self, create_product, create_price, _):
+        for _ in range(3):
+            response = self.client.post(self.create_url, {"course": self.course.pk})
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        create_product.assert_called_once()
+        create_price.assert_called_once_with("prod_1", 10000)
+        self.assertEqual(Payment.objects.count(), 3)
+
+    def test_price_change_creates_new_price(self, create_product, create_price, _):
+        self.client.post(self.create_url, {"course": self.course.pk})
+        self.course.price = 150
+        self.course.save()
+        create_price.return_value = "price_2"
+
+        self.client.post(self.create_url, {"course": self.course.pk})
+
+        create_product.assert_called_once()
+        create_price.assert_called_with("prod_1", 15000)
+        product = StripeProduct.objects.get(course=self.course)
+        self.assertEqual(product.price_id, "price_2")
+        self.assertEqual(product.unit_amount, 15000)
+
+    def test_waits_for_price_created_by_another_request(
+        self, create_product, create_price, _
+    ):
+        lock_key = f"payments:course:{self.course.pk}:stripe-price:lock"
+        cache.set(lock_key, "another request")
+
+        def another_request_finishes(delay):
+            StripeProduct.objects.create(
+                course=self.course,
+                product_id="prod_2",
+                price_id="price_2",
+                unit_amount=10000,
+            )
+            cache.delete(lock_key)
+
+        with mock.patch("common.locks.time.sleep", another_request_finishes):
+            self.assertEqual(get_course_stripe_price_id(self.course), "price_2")
+
+        create_product.assert_not_called()
+        create_price.assert_not_called()
+
+    def test_idempotency_key_replays_response(self, create_product, create_price, _):
+        cache.clear()
+        headers = {"Idempotency-Key": "key-1"}
+
+        first = self.client.post(
+            self.create_url, {"course": self.course.pk}, headers=headers
+        )
+        second = self.client.post(
+            self.create_url, {"course": self.course.pk}, headers=headers
+        )
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_idempotency_key_reused_with_another_body(self, *mocks):
+        cache.clear()
+        other = Course.objects.create(title="Other", owner=self.user, price=10)
+        headers = {"Idempotency-Key": "key-1"}
+
+        self.client.post(self.create_url, {"course": self.course.pk}, headers=headers)
+        response = self.client.post(
+            self.create_url, {"course": other.pk}, headers=headers
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_LOCK_TIMEOUT=0.3)
+    def test_idempotency_key_waits_for_in_flight_request(self, *mocks):
+        cache.clear()
+        headers = {"Idempotency-Key": "key-1"}
+        first = self.client.post(
+            self.create_url, {"course": self.course.pk}, headers=headers
+        )
+        cache_key = get_idempotency_cache_key(
+            self.user.pk, "POST", self.create_url, "key-1"
+        )
+        record = cache.get(cache_key)
+
+        # request is still in progress
+        cache.set(cache_key, {**record, "state": "in-flight"})
+        response = self.client.post(
+            self.create_url, {"course": self.course.pk}, headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        # request completes while the duplicate waits
+        threading.Timer(0.1, cache.set, (cache_key, record)).start()
+        response = self.client.post(
+            self.create_url, {"course": self.course.pk}, headers=headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, first.data)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_checkout_session_uses_stored_price(self, *mocks):
+        StripeProduct.objects.create(
+            course=self.course,
+            product_id="prod_0",
+            price_id="price_0",
+            unit_amount=10000,
+        )
+
+        self.client.post(self.create_url, {"course": self.course.pk})
+
+        create_product, create_price, create_session = mocks
+        create_product.assert_not_called()
+        create_price.assert_not_called()
+        self.assertEqual(create_session.call_args.args[0], "price_0")
+
+
+class AsyncPaymentCreateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.course = Course.objects.create(title="Course", owner=self.user, price=100)
+        self.create_url = reverse("payments:payment-create")
+        self.client.force_authenticate(user=self.user)
+
+    @mock.patch.object(create_payment_checkout_session, "delay")
+    @mock.patch("payments.views.get_course_stripe_price_id")
+    def test_returns_pending_payment(self, get_price_id, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.create_url,
+                {"course": self.course.pk},
+                headers={"Prefer": "respond-async"},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["checkout_status"], "pending")
+        self.assertIsNone(response.data["payment_url"])
+        self.assertEqual(response["Location"], response.data["status_url"])
+        get_price_id.assert_not_called()
+        delay.assert_called_once()
+        self.assertEqual(delay.call_args.args[0], response.data["id"])
+
+        response = self.client.get(response["Location"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["checkout_status"], "pending")
+
+    @mock.patch.object(
+        create_payment_checkout_session, "delay", side_effect=OSError("no broker")
+    )
+    def test_marks_failed_if_not_enqueued(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                self.create_url,
+                {"course": self.course.pk},
+                headers={"Prefer": "respond-async"},
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        response = self.client.get(response["Location"])
+        self.assertEqual(response.data["checkout_status"], "failed")
+
+    def test_payment_detail_is_scoped_to_owner(self):
+        other = User.objects.create_user(email="other@test.com", password="pass")  # type: ignore
+        payment = Payment.objects.create(
+            user=other, amount=100, method=Payment.PaymentMethod.CASH
+        )
+
+        response = self.client.get(
+            reverse("payments:payment-detail", args=[payment.pk])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(PAYMENT_CHECKOUT_MAX_RETRIES=2)
+@mock.patch("payments.tasks.get_course_stripe_price_id", return_value="price_1")
+class CreatePaymentCheckoutSessionTaskTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        course = Course.objects.create(title="Course", owner=self.user, price=100)
+        self.payment = Payment.objects.create(
+            user=self.user,
+            course=course,
+            amount=100,
+            method=Payment.PaymentMethod.STRIPE,
+            checkout_status=Payment.CheckoutStatus.PENDING,
+        )
+
+    def run_task(self):
+        return create_payment_checkout_session.apply(
+            (self.payment.pk, "https://success", "https://cancel")
+        ).get()
+
+    @mock.patch("payments.tasks.create_stripe_checkout_session")
+    def test_retries_and_fills_session(self, create_session, _):
+        create_session.side_effect = [
+            stripe.APIConnectionError("timeout"),
+            SimpleNamespace(id="cs_test", url="https://stripe.com/pay"),
+        ]
+
+        self.assertEqual(self.run_task(), "ready")
+
+        self.assertEqual(create_session.call_count, 2)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.stripe_session_id, "cs_test")
+        self.assertEqual(self.payment.payment_url, "https://stripe.com/pay")
+
+    @mock.patch(
+        "payments.tasks.create_stripe_checkout_session",
+        side_effect=stripe.APIConnectionError("timeout"),
+    )
+    def test_marks_failed_after_retries(self, create_session, _):
+        self.assertEqual(self.run_task(), "failed")
+
+        self.assertEqual(create_session.call_count, 3)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.checkout_status, "failed")
+        self.assertIsNone(self.payment.stripe_session_id)
+
+    @mock.patch(
+        "payments.tasks.create_stripe_checkout_session",
+        side_effect=KeyError("url"),
+    )
+    def test_marks_failed_on_unexpected_error(self, create_session, _):
+        with self.assertRaises(KeyError):
+            self.run_task()
+
+        create_session.assert_called_once()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.checkout_status, "failed")
+
+    @mock.patch("payments.tasks.create_stripe_checkout_session")
+    def test_skips_processed_payment(self, create_session, _):
+        self.payment.checkout_status = Payment.CheckoutStatus.READY
+        self.payment.save()
+
+        self.assertEqual(self.run_task(), "ready")
+
+        create_session.assert_not_called()
+
+
+WEBHOOK_SECRET = "whsec_test"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.payment = Payment.objects.create(
+            user=self.user,
+            amount=100,
+            method=Payment.PaymentMethod.STRIPE,
+            stripe_session_id="cs_test",
+        )
+        self.webhook_url = reverse("payments:stripe-webhook")
+
+    def post_event(
+        self,
+        event_id="evt_1",
+        event_type="checkout.session.completed",
+        secret=WEBHOOK_SECRET,
+        **session,
+    ):
+        payload = json.dumps(
+            {
+                "id": event_id,
+                "object": "event",
+                "type": event_type,
+                "data": {
+                    "object": {
+                        "id": "cs_test",
+                        "object": "checkout.session",
+                        "payment_status": "paid",
+                        **session,
+                    }
+                },
+            }
+        )
+        timestamp = int(time.time())
+        signature = hmac.new(
+            secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256
+        ).hexdigest()
+        return self.client.post(
+            self.webhook_url,
+            payload,
+            content_type="application/json",
+            headers={"Stripe-Signature": f"t={timestamp},v1={signature}"},
+        )
+
+    def test_marks_payment_paid(self):
+        response = self.post_event()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["processed"])
+        self.payment.refresh_from_db()
+        self.assertTrue(self.payment.is_paid)
+
+    def test_unpaid_session_is_ignored(self):
+        self.post_event(payment_status="unpaid")
+
+        self.payment.refresh_from_db()
+        self.assertFalse(self.payment.is_paid)
+
+    def test_redelivered_event_is_processed_once(self):
+        self.post_event()
+        Payment.objects.update(is_paid=False)
+
+        response = self.post_event()
+
+        self.assertFalse(response.data["processed"])
+        self.assertEqual(StripeEvent.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertFalse(self.payment.is_paid)
+
+    def test_expired_session(self):
+        self.post_event(
+            event_type="checkout.session.expired",
+            status="expired",
+            payment_status="unpaid",
+        )
+
+        self.payment.refresh_from_db()
+        self.assertFalse(self.payment.is_paid)
+        self.assertEqual(self.payment.checkout_status, "expired")
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post_event(secret="whsec_wrong")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(StripeEvent.objects.exists())
+        self.payment.refresh_from_db()
+        self.assertFalse(self.payment.is_paid)
+
+    @mock.patch("payments.services.fetch_stripe_session")
+    def test_status_is_served_from_database(self, fetch_session):
+        self.client.force_authenticate(user=self.user)
+
+        response = self.client.get(reverse("payments:payment-status", args=["cs_test"]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["is_paid"])
+        fetch_session.assert_not_called()
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=None)
+@mock.patch("payments.services.fetch_stripe_session")
+class PaymentStatusTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.payment = Payment.objects.create(
+            user=self.user,
+            amount=100,
+            method=Payment.PaymentMethod.STRIPE,
+            stripe_session_id="cs_test",
+        )
+        self.status_url = reverse("payments:payment-status", args=["cs_test"])
+        self.client.force_authenticate(user=self.user)
+
+    def test_paid_payment_is_served_from_database(self, fetch_session):
+        Payment.objects.update(is_paid=True)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.status_url)
+
+        self.assertTrue(response.data["is_paid"])
+        fetch_session.assert_not_called()
+
+    def test_unpaid_status_is_cached(self, fetch_session):
+        fetch_session.return_value = SimpleNamespace(payment_status="unpaid")
+
+        for _ in range(3):
+            response = self.client.get(self.status_url)
+            self.assertFalse(response.data["is_paid"])
+
+        fetch_session.assert_called_once_with("cs_test")
+
+    def test_paid_status_is_saved(self, fetch_session):
+        fetch_session.return_value = SimpleNamespace(payment_status="paid")
+
+        response = self.client.get(self.status_url)
+
+        self.assertTrue(response.data["is_paid"])
+        self.payment.refresh_from_db()
+        self.assertTrue(self.payment.is_paid)
+        self.assertEqual(RevenueRollup.objects.get().count, 1)
+
+    def test_concurrent_lookups_are_coalesced(self, fetch_session):
+        def slow_fetch(session_id):
+            time.sleep(0.2)
+            return SimpleNamespace(payment_status="unpaid")
+
+        fetch_session.side_effect = slow_fetch
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    get_stripe_session_payment_status("cs_test")
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ["unpaid"] * 5)
+        fetch_session.assert_called_once()
+
+    def test_expired_lock_of_another_request_is_kept(self, fetch_session):
+        lock_key = "payments:session:cs_test:status:lock"
+
+        def slow_fetch(session_id):
+            # the lock expired and was taken by another request meanwhile
+            cache.set(lock_key, "another request")
+            return SimpleNamespace(payment_status="unpaid")
+
+        fetch_session.side_effect = slow_fetch
+
+        self.assertEqual(get_stripe_session_payment_status("cs_test"), "unpaid")
+        self.assertEqual(cache.get(lock_key), "another request")
+
+    @override_settings(STRIPE_SESSION_STATUS_LOCK_TIMEOUT=0.5)
+    def test_waiting_for_lock_is_bounded(self, fetch_session):
+        fetch_session.return_value = SimpleNamespace(payment_status="unpaid")
+        cache.set("payments:session:cs_test:status:lock", "stuck request")
+
+        with mock.patch("common.locks.time.sleep", wraps=time.sleep) as sleep:
+            started = time.monotonic()
+            self.assertEqual(get_stripe_session_payment_status("cs_test"), "unpaid")
+
+        self.assertLess(time.monotonic() - started, 1)
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(delays[:3], [0.05, 0.1, 0.2])
+
+
+@override_settings(PAYMENTS_RECONCILIATION_BATCH_SIZE=2)
+class ReconcileUnpaidPaymentsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.sessions = {
+            "cs_paid": SimpleNamespace(payment_status="paid", status="complete"),
+            "cs_expired": SimpleNamespace(payment_status="unpaid", status="expired"),
+            "cs_open": SimpleNamespace(payment_status="unpaid", status="open"),
+            "cs_error": stripe.APIConnectionError("timeout"),
+        }
+        for session_id in self.sessions:
+            self.create_payment(session_id)
+
+    def create_payment(self, session_id, **kwargs):
+        return Payment.objects.create(
+            user=self.user,
+            amount=100,
+            method=Payment.PaymentMethod.STRIPE,
+            stripe_session_id=session_id,
+            **kwargs,
+        )
+
+    def fetch_session(self, session_id):
+        session = self.sessions[session_id]
+        if isinstance(session, Exception):
+            raise session
+        return session
+
+    def test_reconciles_payments(self):
+        with mock.patch(
+            "payments.services.fetch_stripe_session", side_effect=self.fetch_session
+        ) as fetch_session:
+            report = reconcile_unpaid_payments()
+
+        self.assertEqual(
+            {k: v for k, v in report.items() if k != "duration"},
+            {"checked": 4, "paid": 1, "expired": 1, "failed": 1},
+        )
+        self.assertEqual(fetch_session.call_count, 4)
+        self.assertTrue(Payment.objects.get(stripe_session_id="cs_paid").is_paid)
+        self.assertEqual(
+            Payment.objects.get(stripe_session_id="cs_expired").checkout_status,
+            "expired",
+        )
+        self.assertEqual(Payment.objects.filter(is_paid=True).count(), 1)
+
+    def test_skips_reconciled_and_old_payments(self):
+        Payment.objects.all().delete()
+        self.create_payment("cs_paid", is_paid=True)
+        self.create_payment(
+            "cs_expired", checkout_status=Payment.CheckoutStatus.EXPIRED
+        )
+        old = self.create_payment("cs_open")
+        Payment.objects.filter(pk=old.pk).update(
+            timestamp=timezone.now() - timedelta(days=3)
+        )
+
+        with mock.patch("payments.services.fetch_stripe_session") as fetch_session:
+            report = reconcile_unpaid_payments()
+
+        self.assertEqual(report["checked"], 0)
+        fetch_session.assert_not_called()
+
+
+@override_settings(STRIPE_CIRCUIT_FAILURE_THRESHOLD=3, STRIPE_WEBHOOK_SECRET=None)
+@mock.patch("payments.services.get_stripe_client")
+class StripeClientTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        Payment.objects.create(
+            user=self.user,
+            amount=100,
+            method=Payment.PaymentMethod.STRIPE,
+            stripe_session_id="cs_test",
+        )
+
+    def test_circuit_opens_after_failures(self, get_client):
+        retrieve = get_client.return_value.checkout.sessions.retrieve
+        retrieve.side_effect = stripe.APIConnectionError("timeout")
+
+        for _ in range(3):
+            with self.assertRaises(stripe.APIConnectionError):
+                fetch_stripe_session("cs_test")
+        with self.assertRaises(StripeCircuitOpenError):
+            fetch_stripe_session("cs_test")
+
+        self.assertEqual(retrieve.call_count, 3)
+
+    def test_failures_counter_reset_concurrently(self, get_client):
+        retrieve = get_client.return_value.checkout.sessions.retrieve
+        retrieve.side_effect = stripe.APIConnectionError("timeout")
+        add = cache.add
+        calls = []
+
+        def add_concurrently(key, *args, **kwargs):
+            if key != "payments:stripe:circuit:failures":
+                return add(key, *args, **kwargs)
+            calls.append(key)
+            if len(calls) == 1:
+                # counter was created and deleted by another request opening circuit
+                return False
+            return add(key, *args, **kwargs)
+
+        with mock.patch.object(cache, "add", add_concurrently):
+            with self.assertRaises(stripe.APIConnectionError):
+                fetch_stripe_session("cs_test")
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.get("payments:stripe:circuit:failures"), 1)
+
+    def test_client_errors_dont_open_circuit(self, get_client):
+        retrieve = get_client.return_value.checkout.sessions.retrieve
+        retrieve.side_effect = stripe.InvalidRequestError("No such session", None)
+
+        for _ in range(5):
+            with self.assertRaises(stripe.InvalidRequestError):
+                fetch_stripe_session("cs_test")
+
+        self.assertEqual(retrieve.call_count, 5)
+
+    def test_open_circuit_returns_503(self, get_client):
+        retrieve = get_client.return_value.checkout.sessions.retrieve
+        retrieve.side_effect = stripe.APIConnectionError("timeout")
+        self.client.force_authenticate(user=self.user)
+        url = reverse("payments:payment-status", args=["cs_test"])
+
+        for _ in range(4):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        self.assertEqual(retrieve.call_count, 3)
+
+    def test_metrics(self, get_client):
+        retrieve = get_client.return_value.checkout.sessions.retrieve
+        retrieve.side_effect = [
+            SimpleNamespace(payment_status="unpaid"),
+            stripe.APIConnectionError("timeout"),
+        ]
+        for _ in range(2):
+            try:
+                fetch_stripe_session("cs_test")
+            except stripe.StripeError:
+                pass
+        url = reverse("payments:stripe-metrics")
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["circuit"], {"open": False, "failures": 1})
+        metrics = response.data["functions"]["fetch_stripe_session"]
+        self.assertEqual(metrics["calls"], 2)
+        self.assertEqual(metrics["errors"], 1)
+        self.assertEqual(metrics["rejected"], 0)
+
+
+class RevenueRollupTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.course = Course.objects.create(title="Course", owner=self.user, price=100)
+
+    def create_payment(self, amount, **kwargs):
+        return Payment.objects.create(
+            user=self.user,
+            course=self.course,
+            amount=amount,
+            method=Payment.PaymentMethod.STRIPE,
+            **kwargs,
+        )
+
+    def test_mark_payments_paid_updates_rollups(self):
+        payments = [self.create_payment(100), self.create_payment(50)]
+        self.create_payment(30, is_paid=True)
+        Payment.objects.create(user=self.user, amount=20, method="stripe")
+
+        self.assertEqual(mark_payments_paid(Payment.objects.all()), 3)
+        self.assertEqual(mark_payments_paid(Payment.objects.all()), 0)
+        mark_payments_paid(Payment.objects.filter(pk=payments[0].pk))
+
+        rollups = RevenueRollup.objects.order_by("course")
+        self.assertEqual(
+            [(r.course_id, r.method, r.amount, r.count) for r in rollups],
+            [(self.course.pk, "stripe", 180, 3), (None, "stripe", 20, 1)],
+        )
+
+    def test_deleted_course_revenue_matches_backfill(self):
+        self.create_payment(100, is_paid=True)
+        Payment.objects.create(user=self.user, amount=20, method="stripe", is_paid=True)
+        self.course.delete()
+        rollups = RevenueRollup.objects.values_list(
+            "course_id", "method", "amount", "count"
+        )
+
+        self.assertEqual(list(rollups), [(None, "stripe", 120, 2)])
+        call_command("backfill_revenue_rollups", stdout=StringIO())
+        self.assertEqual(list(rollups), [(None, "stripe", 120, 2)])
+
+    def test_backfill(self):
+        self.create_payment(100, is_paid=True)
+        self.create_payment(50, is_paid=True)
+        self.create_payment(70)
+        old = self.create_payment(30, is_paid=True)
+        Payment.objects.filter(pk=old.pk).update(
+            timestamp=timezone.now() - timedelta(days=2)
+        )
+        RevenueRollup.objects.create(day=timezone.localdate(), method="cash", count=5)
+
+        call_command("backfill_revenue_rollups", stdout=StringIO())
+
+        rollups = RevenueRollup.objects.all()
+        self.assertEqual(
+            [(r.day, r.amount, r.count) for r in rollups],
+            [
+                (timezone.localdate() - timedelta(days=2), 30, 1),
+                (timezone.localdate(), 150, 2),
+            ],
+        )
+
+    def test_revenue_list(self):
+        today = timezone.localdate()
+        for days in range(5):
+            RevenueRollup.objects.create(
+                course=self.course,
+                day=today - timedelta(days=days),
+                method="stripe",
+                amount=100,
+                count=1,
+            )
+        url = reverse("payments:revenue-list")
+
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        response = self.client.get(
+            url,
+            {
+                "course": self.course.pk,
+                "day__gte": today - timedelta(days=3),
+                "day__lte": today - timedelta(days=1),
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["day"] for row in response.data["results"]],
+            [str(today - timedelta(days=days)) for days in (3, 2, 1)],
+        )
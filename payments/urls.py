@@ -1,17 +1,35 @@
 from django.urls import path
 
 from .apps import PaymentsConfig
-from .views import PaymentCreateAPIView, PaymentListAPIView, PaymentStatusAPIView
+from .views import (
+    PaymentCreateAPIView,
+    PaymentExportAPIView,
+    PaymentListAPIView,
+    PaymentRetrieveAPIView,
+    PaymentStatusAPIView,
+    RevenueRollupListAPIView,
+    StripeMetricsAPIView,
+    StripeWebhookAPIView,
+)
 
 app_name = PaymentsConfig.name
 
 
 urlpatterns = [
     path("", PaymentListAPIView.as_view(), name="payment-list"),
+    path("<int:pk>/", PaymentRetrieveAPIView.as_view(), name="payment-detail"),
+    path(
+        "export/<str:export_format>/",
+        PaymentExportAPIView.as_view(),
+        name="payment-export",
+    ),
+    path("revenue/", RevenueRollupListAPIView.as_view(), name="revenue-list"),
     path("create/", PaymentCreateAPIView.as_view(), name="payment-create"),
     path(
         "status/<str:stripe_session_id>/",
         PaymentStatusAPIView.as_view(),
         name="payment-status",
     ),
+    path("webhook/", StripeWebhookAPIView.as_view(), name="stripe-webhook"),
+    path("stripe/metrics/", StripeMetricsAPIView.as_view(), name="stripe-metrics"),
 ]
@@ -1,43 +1,214 @@
+import csv
+import json
 from typing import override
 
 import stripe
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
 from rest_framework.exceptions import APIException
 from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
 
-from .models import Payment
-from .serializers import PaymentSerializer
+from common.idempotency import idempotent
+from common.mixins import MemoizedObjectMixin
+from common.pagination import CursorPaginationMixin
+
+from .models import Payment, RevenueRollup
+from .paginators import PaymentCursorPaginator, PaymentPaginator
+from .serializers import PaymentSerializer, RevenueRollupSerializer
 from .services import (
+    construct_stripe_event,
     create_stripe_checkout_session,
-    create_stripe_price,
-    create_stripe_product,
-    fetch_stripe_session,
+    get_course_stripe_price_id,
+    get_stripe_session_payment_status,
+    handle_stripe_event,
+    mark_payments_paid,
 )
+from .stripe_client import get_stripe_metrics
+from .tasks import create_payment_checkout_session
+
+
+class StripeUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Stripe is temporarily unavailable."
+    default_code = "stripe_unavailable"
+
+
+class UserPaymentsMixin:
+    """Limits payments to the requesting user ones, staff can see all payments."""
+
+    @override
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_staff:
+            return Payment.objects.all()
+        return Payment.objects.filter(user=user.pk)
 
 
-class PaymentListAPIView(generics.ListAPIView):
+class PaymentListAPIView(
+    UserPaymentsMixin, CursorPaginationMixin, generics.ListAPIView
+):
     """
     List Endpoint for Payment.
     Allows ordering by "timestamp" and filtering by "course", "lesson" and "method".
+    "?pagination=cursor" enables cursor pagination.
     """
 
-    queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    pagination_class = PaymentPaginator
+    cursor_pagination_class = PaymentCursorPaginator
 
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     ordering_fields = ["timestamp"]
     filterset_fields = ["course", "lesson", "method"]
 
 
+class Echo:
+    """File-like object returning written value, used to stream csv rows."""
+
+    def write(self, value):
+        return value
+
+
+class PaymentExportAPIView(PaymentListAPIView):
+    """
+    Streams payments as "csv" or "ndjson" file.
+    Accepts the same filtering and ordering as the list endpoint.
+    """
+
+    EXPORT_CHUNK_SIZE = 2000
+    CONTENT_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    @override
+    def get(self, request, export_format: str):
+        if export_format not in self.CONTENT_TYPES:
+            raise Http404
+
+        fields = PaymentSerializer.Meta.fields
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .values_list(*fields)
+            .iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+        )
+
+        if export_format == "csv":
+            content = self.stream_csv(fields, rows)
+        else:
+            content = self.stream_ndjson(fields, rows)
+
+        return StreamingHttpResponse(
+            content,
+            content_type=self.CONTENT_TYPES[export_format],
+            headers={
+                "Content-Disposition": f'attachment; filename="payments.{export_format}"'
+            },
+        )
+
+    def stream_csv(self, fields, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow(row)
+
+    def stream_ndjson(self, fields, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + "\n"
+
+
+class RevenueRollupListAPIView(generics.ListAPIView):
+    """
+    Paid revenue per course, day and method. Staff only.
+    Allows filtering by "course", "method" and "day" range ("day__gte", "day__lte").
+    """
+
+    queryset = RevenueRollup.objects.all()
+    serializer_class = RevenueRollupSerializer
+    pagination_class = PaymentPaginator
+    permission_classes = [IsAdminUser]
+
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        "course": ["exact"],
+        "method": ["exact"],
+        "day": ["exact", "gte", "lte"],
+    }
+
+
 class PaymentCreateAPIView(generics.CreateAPIView):
     """
     Create Payment for Course.
-    Creates stripe checkout session.
+    Creates stripe checkout session, reusing stripe product and price of the course.
+    With "Prefer: respond-async" header a pending payment is returned with 202
+    and the session is created in background, see "status_url" for the result.
+    Supports "Idempotency-Key" header to make retries safe.
     """
 
     serializer_class = PaymentSerializer
 
+    @override
+    @idempotent
+    def post(self, request, *args, **kwargs):
+        return super().post(request, *args, **kwargs)
+
+    def is_async_requested(self) -> bool:
+        prefer = self.request.headers.get("Prefer", "")
+        return "respond-async" in (p.strip() for p in prefer.split(","))
+
+    def get_checkout_urls(self) -> tuple[str, str]:
+        """Returns success and cancel urls of a checkout session."""
+        success_url = self.request.build_absolute_uri(
+            f"/payment/success/{self.request.user.pk}/"
+        )
+        cancel_url = self.request.build_absolute_uri(f"/payment/cancel/")
+        return success_url, cancel_url
+
+    @override
+    def create(self, request, *args, **kwargs):
+        if not self.is_async_requested():
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        course = serializer.validated_data["course"]
+        payment = serializer.save(
+            user=request.user,
+            amount=course.price,
+            method=Payment.PaymentMethod.STRIPE,
+            checkout_status=Payment.CheckoutStatus.PENDING,
+        )
+
+        success_url, cancel_url = self.get_checkout_urls()
+
+        def enqueue_checkout_session():
+            try:
+                create_payment_checkout_session.delay(
+                    payment.pk, success_url, cancel_url
+                )
+            except Exception as e:
+                # nothing else would resolve the pending payment
+                print(f"Failed to enqueue checkout session of ({payment.pk}): {e}")
+                Payment.objects.filter(pk=payment.pk).update(
+                    checkout_status=Payment.CheckoutStatus.FAILED
+                )
+
+        transaction.on_commit(enqueue_checkout_session)
+
+        status_url = reverse(
+            "payments:payment-detail", args=[payment.pk], request=request
+        )
+        return Response(
+            {**serializer.data, "status_url": status_url},
+            status=status.HTTP_202_ACCEPTED,
+            headers={"Location": status_url, "Preference-Applied": "respond-async"},
+        )
+
     @override
     def perform_create(self, serializer):
         user = self.request.user
@@ -45,20 +216,14 @@ class PaymentCreateAPIView(generics.CreateAPIView):
 
         session = None
         try:
-            product_id = create_stripe_product(course.title, course.description)
-            price_id = create_stripe_price(product_id, int(course.price * 100))
-
-            success_url = self.request.build_absolute_uri(
-                f"/payment/success/{user.pk}/"
-            )
-            cancel_url = self.request.build_absolute_uri(f"/payment/cancel/")
+            price_id = get_course_stripe_price_id(course)
+            success_url, cancel_url = self.get_checkout_urls()
             session = create_stripe_checkout_session(price_id, success_url, cancel_url)
         except stripe.StripeError as e:
             print(f"Failed to create a stripe checkout session: {e}")
 
         if not session:
-            raise APIException(
-                code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            raise StripeUnavailable(
                 detail="An error occured during stripe session creation",
             )
 
@@ -69,11 +234,27 @@ class PaymentCreateAPIView(generics.CreateAPIView):
             method=Payment.PaymentMethod.STRIPE,
             stripe_session_id=session.id,
             payment_url=session.url,
+            checkout_status=Payment.CheckoutStatus.READY,
         )
 
 
-class PaymentStatusAPIView(generics.RetrieveAPIView):
-    """Fetches, updates status and returns stripe payment by a given session id."""
+class PaymentRetrieveAPIView(
+    MemoizedObjectMixin, UserPaymentsMixin, generics.RetrieveAPIView
+):
+    """
+    Retrieve Endpoint for Payment.
+    Used to poll checkout status of payments created asynchronously.
+    """
+
+    serializer_class = PaymentSerializer
+
+
+class PaymentStatusAPIView(MemoizedObjectMixin, generics.RetrieveAPIView):
+    """
+    Returns stripe payment by a given session id.
+    Payment status is kept up to date by stripe webhook,
+    if webhook isn't configured, status of unpaid payment is fetched from stripe.
+    """
 
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
@@ -82,18 +263,62 @@ class PaymentStatusAPIView(generics.RetrieveAPIView):
     @override
     def get(self, request, stripe_session_id: str):
         payment = self.get_object()
+        if not settings.STRIPE_WEBHOOK_SECRET and not payment.is_paid:
+            try:
+                payment_status = get_stripe_session_payment_status(
+                    payment.stripe_session_id
+                )
+            except stripe.StripeError as e:
+                print(
+                    "Failed to retrieve a stripe checkout session "
+                    f"{stripe_session_id}: {e}"
+                )
+                raise StripeUnavailable(
+                    detail="An error occured during stripe session retrieving",
+                )
+
+            if payment_status == "paid":
+                mark_payments_paid(Payment.objects.filter(pk=payment.pk))
+                payment.is_paid = True
+
+        return super().get(request, stripe_session_id)
+
+
+class StripeWebhookAPIView(APIView):
+    """
+    Receives stripe webhook events.
+    Events are verified by signature and processed only once.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            return Response(
+                {"detail": "Stripe webhook isn't configured."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
         try:
-            session = fetch_stripe_session(payment.stripe_session_id)
-        except stripe.StripeError as e:
-            print(
-                f"Failed to retrieve a stripe checkout session {stripe_session_id}: {e}"
+            event = construct_stripe_event(
+                request.body, request.headers.get("Stripe-Signature", "")
             )
-            raise APIException(
-                code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="An error occured during stripe session retrieving",
+        except (ValueError, stripe.SignatureVerificationError) as e:
+            print(f"Rejected a stripe webhook event: {e}")
+            return Response(
+                {"detail": "Invalid payload or signature."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if session.payment_status == "paid":
-            payment.is_paid = True
-            payment.save()
-        return super().get(request, stripe_session_id)
+        processed = handle_stripe_event(event)
+        return Response({"processed": processed})
+
+
+class StripeMetricsAPIView(APIView):
+    """Returns stripe circuit breaker state and calls metrics. Admin only."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stripe_metrics())
@@ -0,0 +1,142 @@
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import UTC, datetime
+
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from common.locks import acquire_lock, backoff, release_lock
+
+User = get_user_model()
+
+_last_recorded: dict[int, float] = {}
+_last_recorded_max_size = 10_000
+_buffers = {}
+_buffers_lock = threading.Lock()
+_FLUSH_LOCK_KEY = "users:activity:flush:lock"
+
+
+class LocalActivityBuffer:
+    """
+    In-process buffer of last seen timestamps, meant for tests and development.
+    Other processes can't flush it, see users.checks.
+    """
+
+    is_shared = False
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: dict[int, float] = {}
+
+    def record(self, user_id: int, timestamp: float) -> None:
+        with self.lock:
+            self.entries[user_id] = timestamp
+
+    @contextmanager
+    def drain(self):
+        """Yields buffered entries, they are put back if the block fails."""
+        with self.lock:
+            entries, self.entries = self.entries, {}
+        try:
+            yield entries
+        except BaseException:
+            with self.lock:
+                for user_id, timestamp in entries.items():
+                    if timestamp > self.entries.get(user_id, 0):
+                        self.entries[user_id] = timestamp
+            raise
+
+
+class RedisActivityBuffer:
+    """Buffer of last seen timestamps in a redis hash shared by all processes."""
+
+    KEY = "users:activity"
+    is_shared = True
+
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url)
+
+    def record(self, user_id: int, timestamp: float) -> None:
+        self.client.hset(self.KEY, str(user_id), timestamp)
+
+    @contextmanager
+    def drain(self):
+        """
+        Yields buffered entries, they are deleted only if the block succeeds.
+        Entries left by a failed drain are yielded again by the next one,
+        so drains must not run concurrently, see flush_user_activity.
+        """
+        # renamed hash can't get new entries while being read
+        try:
+            self.client.rename(self.KEY, f"{self.KEY}:draining:{uuid.uuid4().hex}")
+        except redis.ResponseError:
+            pass  # nothing was recorded since the last drain
+
+        draining_keys = list(self.client.scan_iter(match=f"{self.KEY}:draining:*"))
+        entries: dict[int, float] = {}
+        for key in draining_keys:
+            for user_id, ts in self.client.hgetall(key).items():
+                user_id = int(user_id)
+                entries[user_id] = max(float(ts), entries.get(user_id, 0))
+
+        yield entries
+        if draining_keys:
+            self.client.delete(*draining_keys)
+
+
+def get_activity_buffer() -> LocalActivityBuffer | RedisActivityBuffer:
+    """Returns redis buffer if USER_ACTIVITY_BUFFER_URL is set, local one otherwise."""
+    url = settings.USER_ACTIVITY_BUFFER_URL
+    with _buffers_lock:
+        if url not in _buffers:
+            _buffers[url] = RedisActivityBuffer(url) if url else LocalActivityBuffer()
+        return _buffers[url]
+
+
+def record_user_activity(user_id: int) -> None:
+    """
+    Records that user was seen now.
+    Every user is recorded once per USER_ACTIVITY_RECORD_INTERVAL seconds
+    by a process, the rest calls are skipped without touching the buffer.
+    """
+    now = time.time()
+    if now - _last_recorded.get(user_id, 0) < settings.USER_ACTIVITY_RECORD_INTERVAL:
+        return
+
+    if len(_last_recorded) >= _last_recorded_max_size:
+        _last_recorded.clear()
+    _last_recorded[user_id] = now
+    get_activity_buffer().record(user_id, now)
+
+
+def flush_user_activity(wait: float = 0) -> int | None:
+    """
+    Writes buffered timestamps to last_login in bulk. Returns number of users,
+    None if a flush in progress elsewhere hasn't finished in wait seconds.
+    """
+    lock_timeout = settings.USER_ACTIVITY_FLUSH_LOCK_TIMEOUT
+    token = None
+    for _ in backoff(wait):
+        token = acquire_lock(_FLUSH_LOCK_KEY, lock_timeout)
+        if token:
+            break
+    if not token:
+        return None
+
+    try:
+        with get_activity_buffer().drain() as entries:
+            if entries:
+                User.objects.bulk_update(
+                    [
+                        User(pk=user_id, last_login=datetime.fromtimestamp(ts, tz=UTC))
+                        for user_id, ts in entries.items()
+                    ],
+                    ["last_login"],
+                    batch_size=1_000,
+                )
+        return len(entries)
+    finally:
+        release_lock(_FLUSH_LOCK_KEY, token)
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_activity_buffer(app_configs, **kwargs):
+    """User activity buffered by web processes must be flushed by celery worker."""
+    if settings.DEBUG or settings.USER_ACTIVITY_BUFFER_URL:
+        return []
+    return [
+        Warning(
+            "User activity is buffered in memory of every process, "
+            "it is never written to last_login and active users get blocked.",
+            hint="Set USER_ACTIVITY_BUFFER_URL or CACHE_URL to a redis url.",
+            id="users.W001",
+        )
+    ]
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Web processes and celery workers share locks, pending notifications,
+    idempotency keys, circuit breaker state and the denylist via the cache.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    if settings.DEBUG or not backend.endswith("LocMemCache"):
+        return []
+    return [
+        Warning(
+            "Cache is local to every process, web processes and celery workers "
+            "don't see each other's state.",
+            hint="Set CACHE_URL to a redis url.",
+            id="users.W002",
+        )
+    ]
@@ -0,0 +1,25 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _cache_key(user_id: int) -> str:
+    return f"users:denylist:{user_id}"
+
+
+def _timeout() -> float:
+    # tokens of a denied user are valid not longer than access token lifetime
+    return settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"].total_seconds()
+
+
+def deny_user_tokens(user_ids) -> None:
+    """Rejects access tokens of given users issued until now."""
+    denied_at = time.time()
+    cache.set_many({_cache_key(user_id): denied_at for user_id in user_ids}, _timeout())
+
+
+def is_user_denied(user_id: int, issued_at: float) -> bool:
+    """Returns whether user's token issued at given timestamp is rejected."""
+    denied_at = cache.get(_cache_key(user_id))
+    return denied_at is not None and issued_at < denied_at
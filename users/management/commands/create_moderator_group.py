@@ -3,13 +3,14 @@ from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand
 
 from materials.models import Course, Lesson
+from users.roles import MODERATORS
 
 
 class Command(BaseCommand):
     help = "Creates the 'moderators' group with specific permissions"
 
     def handle(self, *args, **options):
-        group_name = "moderators"
+        group_name = MODERATORS
         permissions_needed = [
             ("view_lesson", Lesson),
             ("change_lesson", Lesson),
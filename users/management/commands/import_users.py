@@ -0,0 +1,212 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched
+from pathlib import Path
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from users.roles import invalidate_user_roles
+
+User = get_user_model()
+
+PROFILE_FIELDS = ["first_name", "last_name", "phone", "city"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports users from a CSV or JSONL file with 'email', 'password' "
+        "and optional profile fields. Existing emails are skipped, "
+        "passwords are hashed in parallel processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="File format, guessed by the extension by default.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1_000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of processes hashing passwords.",
+        )
+        parser.add_argument(
+            "--group",
+            action="append",
+            default=[],
+            dest="groups",
+            help="Group to add created users to, can be repeated.",
+        )
+        parser.add_argument(
+            "--include-existing",
+            action="store_true",
+            help="Add users that already existed to --group too.",
+        )
+
+    def handle(self, *args, **options):
+        self.invalid_count = 0
+        path = options["path"]
+        file_format = options["format"] or path.suffix.lstrip(".")
+        if file_format not in ("csv", "jsonl"):
+            raise CommandError("Unknown file format, use --format.")
+
+        groups = list(Group.objects.filter(name__in=options["groups"]))
+        missing = set(options["groups"]) - {group.name for group in groups}
+        if missing:
+            raise CommandError(f"Groups not found: {', '.join(sorted(missing))}")
+
+        created = skipped = 0
+        with (
+            path.open(newline="") as file,
+            self.get_hasher(options["workers"]) as hasher,
+        ):
+            rows = self.read_rows(file, file_format)
+            for batch in batched(self.clean_rows(rows), options["batch_size"]):
+                emails = [row["email"] for row in batch]
+                existing = set(
+                    User.objects.filter(email__in=emails).values_list(
+                        "email", flat=True
+                    )
+                )
+                new_rows = [row for row in batch if row["email"] not in existing]
+                passwords = list(
+                    hasher.map(
+                        make_password, [row.get("password") or None for row in new_rows]
+                    )
+                )
+
+                with transaction.atomic():
+                    User.objects.bulk_create(
+                        (
+                            User(
+                                email=row["email"],
+                                password=password,
+                                **{f: row.get(f) or "" for f in PROFILE_FIELDS},
+                            )
+                            for row, password in zip(new_rows, passwords)
+                        ),
+                        ignore_conflicts=True,
+                    )
+                    # rows created concurrently are dropped by ignore_conflicts,
+                    # salted hashes tell the ones created by this import
+                    created_ids = list(
+                        User.objects.filter(
+                            email__in=[row["email"] for row in new_rows],
+                            password__in=passwords,
+                        ).values_list("pk", flat=True)
+                    )
+                    if groups:
+                        if options["include_existing"]:
+                            user_ids = list(
+                                User.objects.filter(email__in=emails).values_list(
+                                    "pk", flat=True
+                                )
+                            )
+                        else:
+                            user_ids = created_ids
+                        self.add_to_groups(user_ids, groups)
+
+                created += len(created_ids)
+                skipped += len(batch) - len(created_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} users, skipped {skipped} existing "
+                f"and {self.invalid_count} invalid rows."
+            )
+        )
+
+    def get_hasher(self, workers: int):
+        if workers > 1:
+            return ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+        return _InlineExecutor()
+
+    def read_rows(self, file, file_format: str):
+        """Yields rows as dicts, malformed JSONL lines as None."""
+        if file_format == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        yield None
+
+    def clean_rows(self, rows):
+        """Normalizes emails, skips malformed rows, invalid and repeated emails."""
+        seen = set()
+        for line, row in enumerate(rows, start=1):
+            if not isinstance(row, dict):
+                self.stderr.write(f"Row {line}: not a JSON object")
+                self.invalid_count += 1
+                continue
+
+            email = User.objects.normalize_email(str(row.get("email") or "").strip())
+            try:
+                validate_email(email)
+            except ValidationError:
+                self.stderr.write(f"Row {line}: invalid email {email!r}")
+                self.invalid_count += 1
+                continue
+
+            if email in seen:
+                self.stderr.write(f"Row {line}: repeated email {email!r}")
+                self.invalid_count += 1
+                continue
+
+            row = {**row, "email": email}
+            too_long = [
+                field
+                for field in ["email", *PROFILE_FIELDS]
+                if len(str(row.get(field) or ""))
+                > User._meta.get_field(field).max_length
+            ]
+            if too_long:
+                self.stderr.write(f"Row {line}: too long {', '.join(too_long)}")
+                self.invalid_count += 1
+                continue
+
+            seen.add(email)
+            yield {
+                **row,
+                **{f: str(row[f]) for f in PROFILE_FIELDS if row.get(f) is not None},
+            }
+
+    def add_to_groups(self, user_ids: list[int], groups: list[Group]) -> None:
+        Through = User.groups.through
+        Through.objects.bulk_create(
+            (
+                Through(user_id=user_id, group_id=group.pk)
+                for user_id in user_ids
+                for group in groups
+            ),
+            ignore_conflicts=True,
+        )
+        # bulk_create doesn't send m2m_changed
+        invalidate_user_roles(user_ids)
+
+
+class _InlineExecutor:
+    """Executor running functions in the current process."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, func, *iterables):
+        return map(func, *iterables)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_active", True), ("is_staff", False), ("is_superuser", False)
+                ),
+                fields=["last_login"],
+                name="user_active_last_login_idx",
+            ),
+        ),
+    ]
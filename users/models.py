@@ -23,6 +23,13 @@ class User(AbstractUser):
 
     class Meta:
         ordering = ["email"]
+        indexes = [
+            models.Index(
+                fields=["last_login"],
+                condition=models.Q(is_active=True, is_staff=False, is_superuser=False),
+                name="user_active_last_login_idx",
+            )
+        ]
 
     def __str__(self):
         return self.email
@@ -2,13 +2,15 @@ from typing import override
 
 from rest_framework import permissions
 
+from .roles import is_moderator
+
 
 class IsOwner(permissions.BasePermission):
     """Validates if user in request is object owner."""
 
     @override
     def has_object_permission(self, request, view, obj):
-        return obj.owner == request.user
+        return obj.owner_id == request.user.pk
 
 
 class IsSelfOrReadOnly(permissions.BasePermission):
@@ -19,7 +21,7 @@ class IsSelfOrReadOnly(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        return obj == request.user
+        return obj.pk == request.user.pk
 
 
 class IsModerator(permissions.BasePermission):
@@ -27,7 +29,7 @@ class IsModerator(permissions.BasePermission):
 
     @override
     def has_permission(self, request, view):
-        return request.user.groups.filter(name="moderators").exists()
+        return is_moderator(request.user)
 
     @override
     def has_object_permission(self, request, view, obj):
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+MODERATORS = "moderators"
+
+
+def _cache_key(user_id: int) -> str:
+    return f"users:roles:{user_id}"
+
+
+def get_user_roles(user) -> frozenset[str]:
+    """
+    Returns names of the groups given user belongs to.
+
+    Roles are memoized on the user object for the rest of the request
+    and kept in the cache between requests.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, "_roles", None)
+    if roles is None:
+        key = _cache_key(user.pk)
+        roles = cache.get(key)
+        if roles is None:
+            roles = frozenset(user.groups.values_list("name", flat=True))
+            cache.set(key, roles, settings.USER_ROLES_CACHE_TIMEOUT)
+        user._roles = roles
+
+    return roles
+
+
+def is_moderator(user) -> bool:
+    """Checks if given user is in "moderators" group."""
+    return MODERATORS in get_user_roles(user)
+
+
+def invalidate_user_roles(user_ids) -> None:
+    """Drops cached roles of given users, again once the transaction commits."""
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
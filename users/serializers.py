@@ -1,10 +1,26 @@
+import time
+from decimal import Decimal
 from typing import override
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Sum
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.reverse import reverse
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer as BaseTokenObtainPairSerializer,
+)
+from rest_framework_simplejwt.serializers import (
+    TokenRefreshSerializer as BaseTokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
 
 from payments.serializers import PaymentSerializer
 
+from .authentication import CLAIMS_AT_CLAIM, ROLES_CLAIM
+from .roles import get_user_roles
+
 User = get_user_model()
 
 
@@ -20,7 +36,35 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
 
 class UserPrivateSerializer(serializers.ModelSerializer):
-    payments = PaymentSerializer(many=True, read_only=True)
+    """Private profile with USER_RECENT_PAYMENTS_COUNT most recent payments."""
+
+    payments = serializers.SerializerMethodField()
+    payments_count = serializers.SerializerMethodField()
+    payments_total = serializers.SerializerMethodField()
+    payments_url = serializers.SerializerMethodField()
+
+    def get_payments(self, instance):
+        payments = instance.payments.order_by("-timestamp", "-id")[
+            : settings.USER_RECENT_PAYMENTS_COUNT
+        ]
+        return PaymentSerializer(payments, many=True, context=self.context).data
+
+    def get_payments_count(self, instance):
+        if hasattr(instance, "payments_count"):
+            return instance.payments_count
+        return instance.payments.count()
+
+    def get_payments_total(self, instance):
+        if hasattr(instance, "payments_total"):
+            total = instance.payments_total
+        else:
+            total = instance.payments.filter(is_paid=True).aggregate(
+                total=Sum("amount", default=Decimal(0))
+            )["total"]
+        return f"{total:.2f}"
+
+    def get_payments_url(self, instance):
+        return reverse("payments:payment-list", request=self.context.get("request"))
 
     class Meta:
         model = User
@@ -33,6 +77,9 @@ class UserPrivateSerializer(serializers.ModelSerializer):
             "city",
             "avatar",
             "payments",
+            "payments_count",
+            "payments_total",
+            "payments_url",
         ]
 
 
@@ -40,3 +87,56 @@ class UserPublicSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "email", "first_name", "phone", "city", "avatar"]
+
+
+def add_user_claims(token, user) -> None:
+    """Adds claims used to authenticate the user without a database query."""
+    token[ROLES_CLAIM] = sorted(get_user_roles(user))
+    token[CLAIMS_AT_CLAIM] = time.time()
+    token["is_active"] = user.is_active
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """Issues tokens with user roles and flags claims."""
+
+    @override
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        add_user_claims(token, user)
+        return token
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """Issues access token with up to date user roles and flags claims."""
+
+    @override
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}
+        ).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+
+        access = refresh.access_token
+        add_user_claims(access, user)
+        data = {"access": str(access)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass  # blacklist app isn't installed
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+
+        return data
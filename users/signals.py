@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .denylist import deny_user_tokens
+from .roles import invalidate_user_roles
+
+User = get_user_model()
+
+
+def _update_user_roles(user_ids) -> None:
+    # tokens with old roles claims must be refreshed
+    invalidate_user_roles(user_ids)
+    deny_user_tokens(user_ids)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_groups_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            instance.__dict__.pop("_roles", None)
+            _update_user_roles([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        _update_user_roles(pk_set)
+    elif action == "pre_clear":
+        _update_user_roles(list(instance.user_set.values_list("pk", flat=True)))
+
+
+@receiver(post_save, sender=Group)
+def invalidate_roles_on_group_rename(sender, instance, created, **kwargs):
+    if not created:
+        _update_user_roles(list(instance.user_set.values_list("pk", flat=True)))
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_roles_on_group_delete(sender, instance, **kwargs):
+    _update_user_roles(list(instance.user_set.values_list("pk", flat=True)))
+
+
+@receiver(post_save, sender=User)
+def invalidate_roles_on_user_create(sender, instance, created, **kwargs):
+    if created:
+        invalidate_user_roles([instance.pk])
+
+
+@receiver(post_delete, sender=User)
+def invalidate_roles_on_user_delete(sender, instance, **kwargs):
+    invalidate_user_roles([instance.pk])
+    deny_user_tokens([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def update_denylist_on_user_save(sender, instance, created, **kwargs):
+    # entries expire with the tokens they deny, tokens issued later pass
+    if not instance.is_active:
+        deny_user_tokens([instance.pk])
@@ -0,0 +1,14 @@
+from celery import shared_task
+
+from . import activity
+
+
+@shared_task
+def flush_user_activity() -> int | None:
+    """Writes buffered user activity to last_login."""
+    flushed = activity.flush_user_activity()
+    if flushed is None:
+        print("User activity is already being flushed by another run")
+    else:
+        print(f"User activity flushed for {flushed} users")
+    return flushed
@@ -1,13 +1,67 @@
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from materials.models import Course
+from materials.tasks import block_inactive_users
+
+from payments.models import Payment
+
+from . import activity
+from .checks import check_activity_buffer, check_shared_cache
+from .denylist import is_user_denied
+from .roles import MODERATORS, get_user_roles, is_moderator
+from .tasks import flush_user_activity
+from .throttles import (
+    LoginEmailThrottle,
+    LoginIPThrottle,
+    RegisterEmailThrottle,
+    RegisterIPThrottle,
+)
+from .views import UserRetrieveUpdateDestroyAPIView
 
 User = get_user_model()
 
 
+class ChecksTests(TestCase):
+    @override_settings(DEBUG=False)
+    def test_local_memory_cache_is_reported(self):
+        with override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            }
+        ):
+            self.assertEqual([e.id for e in check_shared_cache(None)], ["users.W002"])
+
+        with override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                    "LOCATION": "redis://localhost:6379/0",
+                }
+            }
+        ):
+            self.assertEqual(check_shared_cache(None), [])
+
+
 class TokenViewsTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
         self.obtain_url = reverse("users:token_obtain_pair")
         self.refresh_url = reverse("users:token_refresh")
@@ -50,6 +104,7 @@ class TokenViewsTests(APITestCase):
 
 class UserViewsTests(APITestCase):
     def setUp(self) -> None:
+        cache.clear()
         self.main_user = User.objects.create_user(  # type: ignore
             email="main@main.com",
             first_name="Firstname",
@@ -91,6 +146,30 @@ class UserViewsTests(APITestCase):
         self.assertIsNotNone(request.data.get("last_name"))
         self.assertIsNotNone(request.data.get("payments"))
 
+    @override_settings(USER_RECENT_PAYMENTS_COUNT=3)
+    def test_retrieve_self_payments(self):
+        for amount in range(1, 6):
+            Payment.objects.create(
+                user=self.main_user, amount=amount, method="cash", is_paid=amount > 2
+            )
+        Payment.objects.create(user=self.other_user, amount=100, method="cash")
+        self.authenticate(self.main_user)
+
+        detail_url = reverse("users:user-detail", args=[self.main_user.id])
+        with self.assertNumQueries(2):
+            request = self.client.get(detail_url)
+
+        self.assertEqual(
+            [payment["amount"] for payment in request.data["payments"]],
+            ["5.00", "4.00", "3.00"],
+        )
+        self.assertEqual(request.data["payments_count"], 5)
+        self.assertEqual(request.data["payments_total"], "12.00")
+        self.assertEqual(
+            request.data["payments_url"],
+            "http://testserver" + reverse("payments:payment-list"),
+        )
+
     def test_retrieve_foreign(self):
         self.authenticate(self.other_user)
 
@@ -113,6 +192,27 @@ class UserViewsTests(APITestCase):
         self.assertEqual(request.status_code, status.HTTP_404_NOT_FOUND)
 
     # UPDATE
+    def test_update_self_query_count(self):
+        self.authenticate(self.main_user)
+
+        detail_url = reverse("users:user-detail", args=[self.main_user.id])
+        # user is loaded once, then updated, then payments summary is read
+        with self.assertNumQueries(5):
+            request = self.client.patch(detail_url, {"city": "Moscow"})
+        self.assertEqual(request.status_code, status.HTTP_200_OK)
+
+    def test_object_is_memoized_per_request(self):
+        request = APIRequestFactory().get("/")
+        force_authenticate(request, user=self.main_user)
+        view = UserRetrieveUpdateDestroyAPIView()
+        view.setup(request, pk=self.main_user.pk)
+        view.request = view.initialize_request(request)
+        view.format_kwarg = None
+
+        with self.assertNumQueries(1):
+            self.assertEqual(view.get_object(), self.main_user)
+            self.assertIs(view.get_object(), view.get_object())
+
     def test_update_self(self):
         self.authenticate(self.main_user)
 
@@ -147,3 +247,500 @@ class UserViewsTests(APITestCase):
         self.assertEqual(request.status_code, status.HTTP_403_FORBIDDEN)
         self.other_user.refresh_from_db()
         self.assertTrue(self.other_user)
+
+
+class UserRolesTests(TestCase):
+    def setUp(self):
+        self.moderators_group = Group.objects.create(name=MODERATORS)
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+
+    def test_roles_are_memoized_per_request(self):
+        user = self.fresh_user()
+        with self.assertNumQueries(1):
+            self.assertFalse(is_moderator(user))
+            self.assertFalse(is_moderator(user))
+
+    def test_roles_are_cached_between_requests(self):
+        get_user_roles(self.fresh_user())
+
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_roles(user), frozenset())
+
+    def test_cache_invalidated_on_group_add_and_remove(self):
+        self.assertFalse(is_moderator(self.fresh_user()))
+
+        self.user.groups.add(self.moderators_group)
+        self.assertTrue(is_moderator(self.fresh_user()))
+
+        self.moderators_group.user_set.remove(self.user)
+        self.assertFalse(is_moderator(self.fresh_user()))
+
+    def test_cache_invalidated_on_group_clear(self):
+        self.user.groups.add(self.moderators_group)
+        self.assertTrue(is_moderator(self.fresh_user()))
+
+        self.moderators_group.user_set.clear()
+        self.assertFalse(is_moderator(self.fresh_user()))
+
+
+class StatelessJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.moderators_group = Group.objects.create(name=MODERATORS)
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.user.groups.add(self.moderators_group)
+        self.course = Course.objects.create(title="Course", owner=self.user, price=10)
+
+    def obtain_tokens(self):
+        response = self.client.post(
+            reverse("users:token_obtain_pair"),
+            {"email": "test@test.com", "password": "pass"},
+        )
+        return response.data["access"], response.data["refresh"]
+
+    def authenticate(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_token_has_role_claims(self):
+        access, refresh = self.obtain_tokens()
+
+        token = AccessToken(access)
+        self.assertEqual(token["roles"], [MODERATORS])
+        self.assertTrue(token["is_active"])
+        self.assertFalse(token["is_staff"])
+        self.assertEqual(RefreshToken(refresh)["roles"], [MODERATORS])
+
+    def test_safe_request_doesnt_load_user(self):
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+
+        # course and lessons queries only, roles are taken from the token
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("materials:course-detail", args=[self.course.pk])
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_unsafe_request_loads_user(self):
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+        # database only change, the denylist isn't updated
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        url = reverse("materials:course-detail", args=[self.course.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(url, {"title": "New title"})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_staff_request_loads_user(self):
+        self.user.is_staff = True
+        self.user.save()
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+
+        response = self.client.get(reverse("payments:stripe-metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deleted_user_is_denied(self):
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+
+        self.user.delete()
+        response = self.client.get(reverse("materials:course-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_groups_change_denies_issued_tokens(self):
+        access, _ = self.obtain_tokens()
+        token = AccessToken(access)
+        self.authenticate(str(token))
+
+        self.user.groups.remove(self.moderators_group)
+        response = self.client.get(reverse("materials:course-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        token["claims_at"] = time.time()
+        self.authenticate(str(token))
+        response = self.client.get(reverse("materials:course-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_user_save_doesnt_allow_denied_tokens(self):
+        owner = User.objects.create_user(email="owner@test.com", password="pass")  # type: ignore
+        course = Course.objects.create(title="Foreign", owner=owner, price=10)
+        url = reverse("materials:course-detail", args=[course.pk])
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.groups.remove(self.moderators_group)
+        self.user.save()
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_without_roles_falls_back_to_database(self):
+        access = AccessToken.for_user(self.user)
+        self.authenticate(str(access))
+
+        # user and roles are loaded along with course and lessons
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse("materials:course-detail", args=[self.course.pk])
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivated_user_is_denied(self):
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse("materials:course-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # reactivation doesn't revive tokens issued before
+        self.user.is_active = True
+        self.user.save()
+        response = self.client.get(reverse("materials:course-list"))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        access, _ = self.obtain_tokens()
+        self.authenticate(access)
+        response = self.client.get(reverse("materials:course-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_blocked_inactive_users_are_denied(self):
+        User.objects.filter(pk=self.user.pk).update(
+            last_login=timezone.now() - timedelta(days=60)
+        )
+
+        block_inactive_users.apply()
+
+        self.assertTrue(is_user_denied(self.user.pk, issued_at=time.time() - 1))
+
+    def test_refresh_updates_roles(self):
+        _, refresh = self.obtain_tokens()
+        self.user.groups.clear()
+
+        # user and roles
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                reverse("users:token_refresh"), {"refresh": refresh}
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AccessToken(response.data["access"])["roles"], [])
+
+    def test_refresh_of_deleted_user(self):
+        _, refresh = self.obtain_tokens()
+        self.user.delete()
+
+        response = self.client.post(
+            reverse("users:token_refresh"), {"refresh": refresh}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class ImportUsersCommandTests(TestCase):
+    def setUp(self):
+        self.moderators_group = Group.objects.create(name=MODERATORS)
+        self.existing = User.objects.create_user(email="old@test.com", password="pass")  # type: ignore
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write_file(self, name, content):
+        path = Path(self.dir.name) / name
+        path.write_text(content)
+        return path
+
+    def import_users(self, path, *args):
+        stdout = StringIO()
+        call_command("import_users", path, *args, stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_import_csv(self):
+        path = self.write_file(
+            "users.csv",
+            "email,password,first_name,city\n"
+            " new@TEST.com ,secret,New,Moscow\n"
+            "old@test.com,other,,\n"
+            "not-an-email,secret,,\n"
+            "new@test.com,again,,\n"
+            "nopass@test.com,,,\n",
+        )
+
+        output = self.import_users(path, "--workers", "1", "--batch-size", "2")
+
+        self.assertIn("Created 2 users, skipped 1 existing and 2 invalid rows", output)
+        user = User.objects.get(email="new@test.com")
+        self.assertTrue(user.check_password("secret"))
+        self.assertEqual((user.first_name, user.city), ("New", "Moscow"))
+        self.assertFalse(
+            User.objects.get(email="nopass@test.com").has_usable_password()
+        )
+        self.assertTrue(User.objects.get(email="old@test.com").check_password("pass"))
+
+    def test_import_jsonl_in_process_pool(self):
+        path = self.write_file(
+            "users.jsonl",
+            '{"email": "a@test.com", "password": "secret"}\n'
+            '{"email": "b@test.com", "password": "secret"}\n',
+        )
+
+        self.import_users(path, "--workers", "2")
+
+        for email in ("a@test.com", "b@test.com"):
+            self.assertTrue(User.objects.get(email=email).check_password("secret"))
+
+    def test_import_assigns_groups(self):
+        self.assertFalse(is_moderator(self.existing))
+        path = self.write_file(
+            "users.csv", "email,password\nnew@test.com,secret\nold@test.com,\n"
+        )
+
+        self.import_users(path, "--workers", "1", "--group", MODERATORS)
+        self.import_users(path, "--workers", "1", "--group", MODERATORS)
+
+        self.assertEqual(self.moderators_group.user_set.count(), 1)
+        self.assertTrue(is_moderator(User.objects.get(email="new@test.com")))
+        self.assertFalse(is_moderator(User.objects.get(pk=self.existing.pk)))
+
+        self.import_users(
+            path, "--workers", "1", "--group", MODERATORS, "--include-existing"
+        )
+
+        self.assertEqual(self.moderators_group.user_set.count(), 2)
+        self.assertTrue(is_moderator(User.objects.get(pk=self.existing.pk)))
+
+    def test_malformed_rows_are_skipped(self):
+        path = self.write_file(
+            "users.jsonl",
+            '{"email": "a@test.com", "password": "secret"}\n'
+            "{not json\n"
+            "[1, 2]\n"
+            f'{{"email": "long@test.com", "city": "{"x" * 101}"}}\n'
+            '{"email": "b@test.com", "phone": 123}\n',
+        )
+
+        output = self.import_users(path, "--workers", "1")
+
+        self.assertIn("Created 2 users, skipped 0 existing and 3 invalid rows", output)
+        self.assertEqual(User.objects.get(email="b@test.com").phone, "123")
+        self.assertFalse(User.objects.filter(email="long@test.com").exists())
+
+    def test_users_created_concurrently_are_not_counted(self):
+        path = self.write_file("users.csv", "email,password\nnew@test.com,secret\n")
+        create = User.objects.bulk_create
+
+        def create_concurrently(users, **kwargs):
+            User.objects.create_user(email="new@test.com", password="other")  # type: ignore
+            return create(users, **kwargs)
+
+        with mock.patch.object(User.objects, "bulk_create", create_concurrently):
+            output = self.import_users(path, "--workers", "1", "--group", MODERATORS)
+
+        self.assertIn("Created 0 users, skipped 1 existing", output)
+        self.assertEqual(self.moderators_group.user_set.count(), 0)
+
+    def test_unknown_group(self):
+        path = self.write_file("users.csv", "email,password\n")
+        with self.assertRaises(CommandError):
+            self.import_users(path, "--group", "unknown")
+
+
+@override_settings(USER_ACTIVITY_BUFFER_URL=None)
+class UserActivityTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        activity._last_recorded.clear()
+        activity._buffers.clear()
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        User.objects.filter(pk=self.user.pk).update(
+            last_login=timezone.now() - timedelta(days=60)
+        )
+        access = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+    def test_activity_is_buffered_and_flushed(self):
+        for _ in range(3):
+            self.client.get(reverse("materials:course-list"))
+        self.assertLess(
+            User.objects.get(pk=self.user.pk).last_login,
+            timezone.now() - timedelta(days=1),
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(flush_user_activity(), 1)
+
+        last_login = User.objects.get(pk=self.user.pk).last_login
+        self.assertGreater(last_login, timezone.now() - timedelta(minutes=1))
+        self.assertEqual(flush_user_activity(), 0)
+
+    def test_local_buffer_is_not_flushed_by_inactivity_sweep(self):
+        self.client.get(reverse("materials:course-list"))
+
+        with mock.patch("materials.tasks.flush_user_activity") as flush:
+            block_inactive_users.apply()
+
+        flush.assert_not_called()
+
+    def test_active_users_are_not_blocked(self):
+        self.client.get(reverse("materials:course-list"))
+
+        with mock.patch.object(activity.LocalActivityBuffer, "is_shared", True):
+            block_inactive_users.apply()
+
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_recording_doesnt_write_to_database(self):
+        access = AccessToken.for_user(self.user)
+        access["roles"] = []
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+
+        with self.assertNumQueries(1):
+            self.client.get(reverse("materials:course-list"))
+
+        with activity.get_activity_buffer().drain() as entries:
+            self.assertEqual(len(entries), 1)
+
+    def test_failed_flush_keeps_entries(self):
+        self.client.get(reverse("materials:course-list"))
+
+        with (
+            mock.patch.object(User.objects, "bulk_update", side_effect=DatabaseError),
+            self.assertRaises(DatabaseError),
+        ):
+            flush_user_activity()
+
+        self.assertEqual(flush_user_activity(), 1)
+
+    def test_inactivity_sweep_waits_for_flush_in_progress(self):
+        self.client.get(reverse("materials:course-list"))
+        cache.add(activity._FLUSH_LOCK_KEY, "other flush")
+        self.assertIsNone(flush_user_activity())
+
+        with (
+            mock.patch.object(activity.LocalActivityBuffer, "is_shared", True),
+            # the other flush finishes while the sweep waits
+            mock.patch(
+                "common.locks.time.sleep",
+                side_effect=lambda _: cache.delete(activity._FLUSH_LOCK_KEY),
+            ) as sleep,
+        ):
+            block_inactive_users.apply()
+
+        sleep.assert_called_once()
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    @override_settings(DEBUG=False, USER_ACTIVITY_BUFFER_URL=None)
+    def test_local_buffer_is_reported_by_checks(self):
+        self.assertEqual([e.id for e in check_activity_buffer(None)], ["users.W001"])
+
+        with override_settings(USER_ACTIVITY_BUFFER_URL="redis://localhost:6379/0"):
+            self.assertEqual(check_activity_buffer(None), [])
+
+
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(email="test@test.com", password="pass")  # type: ignore
+        self.obtain_url = reverse("users:token_obtain_pair")
+        self.register_url = reverse("users:register")
+        self.metrics_url = reverse("users:throttle-metrics")
+
+    def login(self, email, password="wrong", ip="10.0.0.1"):
+        return self.client.post(
+            self.obtain_url, {"email": email, "password": password}, REMOTE_ADDR=ip
+        )
+
+    def test_login_throttled_by_email_from_any_ip(self):
+        with mock.patch.object(LoginEmailThrottle, "rate", "2/min", create=True):
+            self.login("test@test.com", ip="10.0.0.1")
+            self.login("TEST@test.com ", ip="10.0.0.2")
+            with mock.patch(
+                "django.contrib.auth.backends.ModelBackend.authenticate"
+            ) as auth:
+                response = self.login("test@test.com", password="pass", ip="10.0.0.3")
+
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response)
+        auth.assert_not_called()
+        response = self.login("other@test.com", ip="10.0.0.1")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_throttled_by_ip(self):
+        with mock.patch.object(LoginIPThrottle, "rate", "2/min", create=True):
+            self.login("first@test.com")
+            self.login("second@test.com")
+            response = self.login("test@test.com", password="pass")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+            response = self.login("test@test.com", password="pass", ip="10.0.0.2")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_limit_holds_when_history_read_is_stale(self):
+        request = mock.Mock(data={"email": "test@test.com"})
+        with (
+            mock.patch.object(LoginEmailThrottle, "rate", "2/min", create=True),
+            # concurrent requests see the cache as it was before any of them
+            mock.patch.object(
+                LoginEmailThrottle.cache,
+                "get",
+                side_effect=lambda key, default=None, **kwargs: default,
+            ),
+        ):
+            allowed = [
+                LoginEmailThrottle().allow_request(request, None) for _ in range(3)
+            ]
+
+        self.assertEqual(allowed, [True, True, False])
+
+    def test_non_object_body_is_rejected_by_validation(self):
+        for url in (self.obtain_url, self.register_url):
+            response = self.client.post(url, [1, 2], format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_registration_throttled(self):
+        with (
+            mock.patch.object(RegisterIPThrottle, "rate", "2/hour", create=True),
+            mock.patch.object(RegisterEmailThrottle, "rate", "1/hour", create=True),
+        ):
+            response = self.client.post(
+                self.register_url, {"email": "new@test.com", "password": "pass"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.client.post(
+                self.register_url, {"email": "new@test.com", "password": "pass"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            response = self.client.post(
+                self.register_url, {"email": "another@test.com", "password": "pass"}
+            )
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_metrics_count_rejected_requests(self):
+        with mock.patch.object(LoginEmailThrottle, "rate", "1/min", create=True):
+            for _ in range(3):
+                self.login("test@test.com")
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.metrics_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(self.metrics_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["login_email"]["rejected"], 2)
+        self.assertEqual(response.data["login_ip"], {"rate": "30/min", "rejected": 0})
@@ -0,0 +1,119 @@
+import hashlib
+from collections.abc import Mapping
+from typing import override
+
+from django.core.cache import cache
+from rest_framework.throttling import SimpleRateThrottle
+
+_REJECTED_KEY = "users:throttle:rejected:{scope}"
+
+
+class CountingRateThrottle(SimpleRateThrottle):
+    """
+    Fixed window throttle keeping an atomic request counter in the shared cache,
+    so concurrent requests can't pass on the same stale count.
+    Counts rejected requests per scope, see get_throttle_metrics.
+    """
+
+    @override
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window_key = f"{self.key}:{int(self.now // self.duration)}"
+        self.cache.add(window_key, 0, self.duration)
+        try:
+            count = self.cache.incr(window_key)
+        except ValueError:
+            # the window has just expired
+            self.cache.add(window_key, 1, self.duration)
+            count = 1
+
+        if count > self.num_requests:
+            return self.throttle_failure()
+        return True
+
+    @override
+    def wait(self):
+        return self.duration - self.now % self.duration
+
+    @override
+    def throttle_failure(self):
+        key = _REJECTED_KEY.format(scope=self.scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # first rejection, or the counter was evicted
+            cache.add(key, 1, None)
+        return super().throttle_failure()
+
+
+class IPRateThrottle(CountingRateThrottle):
+    """Limits requests by client IP."""
+
+    @override
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class EmailRateThrottle(CountingRateThrottle):
+    """Limits requests by email in request body, whatever IP they come from."""
+
+    @override
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            return None  # validation rejects it without hashing
+        email = request.data.get("email")
+        if not isinstance(email, str) or not email.strip():
+            return None  # validation rejects it without hashing
+
+        digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": digest}
+
+
+class LoginIPThrottle(IPRateThrottle):
+    scope = "login_ip"
+
+
+class LoginEmailThrottle(EmailRateThrottle):
+    scope = "login_email"
+
+
+class RegisterIPThrottle(IPRateThrottle):
+    scope = "register_ip"
+
+
+class RegisterEmailThrottle(EmailRateThrottle):
+    scope = "register_email"
+
+
+THROTTLES = (
+    LoginIPThrottle,
+    LoginEmailThrottle,
+    RegisterIPThrottle,
+    RegisterEmailThrottle,
+)
+
+
+def get_throttle_metrics() -> dict:
+    """Returns rate and number of rejected requests of every throttle scope."""
+    keys = {
+        throttle.scope: _REJECTED_KEY.format(scope=throttle.scope)
+        for throttle in THROTTLES
+    }
+    rejected = cache.get_many(keys.values())
+    return {
+        throttle.scope: {
+            "rate": throttle().rate,
+            "rejected": rejected.get(keys[throttle.scope], 0),
+        }
+        for throttle in THROTTLES
+    }
@@ -1,8 +1,13 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from .apps import UsersConfig
-from .views import UserCreateAPIView, UserRetrieveUpdateDestroyAPIView
+from .views import (
+    ThrottleMetricsAPIView,
+    UserCreateAPIView,
+    UserRetrieveUpdateDestroyAPIView,
+    UserTokenObtainPairView,
+)
 
 app_name = UsersConfig.name
 
@@ -10,6 +15,9 @@ app_name = UsersConfig.name
 urlpatterns = [
     path("register/", UserCreateAPIView.as_view(), name="register"),
     path("<int:pk>/", UserRetrieveUpdateDestroyAPIView.as_view(), name="user-detail"),
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("token/", UserTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path(
+        "throttles/metrics/", ThrottleMetricsAPIView.as_view(), name="throttle-metrics"
+    ),
 ]
@@ -1,8 +1,17 @@
+from decimal import Decimal
 from typing import override
 
 from django.contrib.auth import get_user_model
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from rest_framework import generics
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from common.mixins import MemoizedObjectMixin
+from payments.models import Payment
 
 from .permissions import IsSelfOrReadOnly
 from .serializers import (
@@ -10,6 +19,13 @@ from .serializers import (
     UserPrivateSerializer,
     UserPublicSerializer,
 )
+from .throttles import (
+    LoginEmailThrottle,
+    LoginIPThrottle,
+    RegisterEmailThrottle,
+    RegisterIPThrottle,
+    get_throttle_metrics,
+)
 
 User = get_user_model()
 
@@ -19,19 +35,62 @@ class UserCreateAPIView(generics.CreateAPIView):
 
     serializer_class = UserCreateSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterIPThrottle, RegisterEmailThrottle]
 
 
-class UserRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
+class UserTokenObtainPairView(TokenObtainPairView):
+    """
+    Issues token pair for email and password.
+    Throttled by IP and email, so rejected attempts don't reach password hashing.
+    """
+
+    throttle_classes = [LoginIPThrottle, LoginEmailThrottle]
+
+
+class ThrottleMetricsAPIView(APIView):
+    """Returns rates and rejected requests of login and registration throttles. Admin only."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_throttle_metrics())
+
+
+class UserRetrieveUpdateDestroyAPIView(
+    MemoizedObjectMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     Returns private profile if user in request is owner.
     Otherwise returns public profile (without last_name and payments).
     """
 
-    queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsSelfOrReadOnly]
 
+    def is_self_requested(self) -> bool:
+        return str(self.request.user.pk) == str(self.kwargs.get(self.lookup_field))
+
+    @override
+    def get_queryset(self):
+        if self.request.method != "GET" or not self.is_self_requested():
+            return User.objects.all()
+
+        payments = Payment.objects.filter(user=OuterRef("pk")).order_by().values("user")
+        return User.objects.annotate(
+            payments_count=Coalesce(
+                Subquery(payments.annotate(count=Count("id")).values("count")), 0
+            ),
+            payments_total=Coalesce(
+                Subquery(
+                    payments.filter(is_paid=True)
+                    .annotate(total=Sum("amount"))
+                    .values("total")
+                ),
+                Decimal(0),
+            ),
+        )
+
     @override
     def get_serializer_class(self):
-        if self.request.user == self.get_object():
+        if self.is_self_requested():
             return UserPrivateSerializer
         return UserPublicSerializer